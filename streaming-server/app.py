@@ -1,10 +1,159 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import face_recognition
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 import numpy as np
+import asyncio
+import io
+import json
+import logging
 import os
+import threading
+import time
+import zipfile
 
-app = FastAPI()
+from embedding_store import EmbeddingStore
+from gallery import ENCODING_DIM, FaceGallery, DEFAULT_TOP_K
+from hot_reload import Reloader
+from metrics import CONTENT_TYPE, REGISTRY, Gauge, Histogram, stage_timer
+from recognition_worker import init_worker, encode_first_file, encode_image_bytes
+
+logger = logging.getLogger("recognize")
+
+# Face decoding/encoding runs in these processes so it never blocks the event loop
+RECOGNITION_WORKERS = int(os.environ.get("RECOGNITION_WORKERS", os.cpu_count() or 1))
+MAX_BATCH_IMAGES = int(os.environ.get("MAX_BATCH_IMAGES", "64"))
+# Upper bound on the images of one batch, uploaded or unzipped, checked before anything is decompressed
+MAX_BATCH_BYTES = int(os.environ.get("MAX_BATCH_BYTES", str(64 * 1024 * 1024)))
+# Also serve faces enrolled in MongoDB/GridFS, polling for new enrollments
+MONGO_FACES = os.environ.get("MONGO_FACES", "0") == "1"
+MONGO_SYNC_INTERVAL = float(os.environ.get("MONGO_SYNC_INTERVAL", "30"))
+# Every Nth poll reloads every document so replaced and deleted faces are noticed too; 0 disables
+MONGO_FULL_SYNC_EVERY = int(os.environ.get("MONGO_FULL_SYNC_EVERY", "10"))
+# Seconds between checks of faces/ for new or changed photos; 0 disables the watcher
+FACES_WATCH_INTERVAL = float(os.environ.get("FACES_WATCH_INTERVAL", "5"))
+# A failed warm-up step is retried with exponential backoff between these bounds, in seconds
+WARMUP_RETRY_DELAY = float(os.environ.get("WARMUP_RETRY_DELAY", "1"))
+WARMUP_MAX_RETRY_DELAY = float(os.environ.get("WARMUP_MAX_RETRY_DELAY", "30"))
+executor = None
+face_sync = None
+warmup_task = None
+sync_task = None
+watch_stop = threading.Event()
+ready = False
+startup_error = None
+
+ENCODE_SECONDS = stage_timer("encode", "api")
+MATCH_SECONDS = stage_timer("match", "api")
+# From the first byte of the upload to the last byte of the response, streamed batches included
+REQUEST_SECONDS = Histogram(
+    "eduvision_request_seconds", "Whole-request time of the recognition endpoints.", ["route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+TIMED_ROUTES = ("/recognize", "/recognize/batch")
+ENCODES_IN_FLIGHT = Gauge("eduvision_encodes_in_flight", "Images queued or being encoded in the worker processes.")
+
+async def sync_mongo_faces():
+    polls = 0
+    while True:
+        await asyncio.sleep(MONGO_SYNC_INTERVAL)
+        polls += 1
+        full = MONGO_FULL_SYNC_EVERY > 0 and polls % MONGO_FULL_SYNC_EVERY == 0
+        try:
+            if await asyncio.to_thread(face_sync.refresh, full):
+                rebuild_gallery()
+        except Exception:
+            logger.exception("MongoDB face sync failed")
+
+def watch_mongo_faces():
+    """Applies face edits and deletions as they happen when MongoDB runs as a replica set."""
+    try:
+        if not face_sync.collection.database.client.admin.command("hello").get("setName"):
+            logger.info("MongoDB is not a replica set, face changes are picked up by polling")
+            return
+        face_sync.watch(rebuild_gallery, watch_stop)
+    except Exception:
+        logger.exception("MongoDB change stream stopped, face changes are picked up by polling")
+
+def start_executor():
+    global executor
+    executor = ProcessPoolExecutor(max_workers=RECOGNITION_WORKERS, initializer=init_worker)
+    if face_sync:
+        face_sync.executor = executor
+
+async def retry_until_done(step, what):
+    """Awaits step() until it succeeds, reporting each failure through /ready in the meantime."""
+    global startup_error
+    delay = WARMUP_RETRY_DELAY
+    while True:
+        try:
+            return await step()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. dlib failed to load) and the pool never recovers; retry on a new one
+                executor.shutdown(wait=False, cancel_futures=True)
+                start_executor()
+            startup_error = f"{what} failed: {e}"
+            logger.exception(f"{what} failed, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARMUP_MAX_RETRY_DELAY)
+
+async def load_gallery():
+    # Through the reloader, so /gallery reports the version the startup load installed. The
+    # watcher may have loaded it first, so check the version rather than this call's result
+    await asyncio.to_thread(gallery_reloader.reload)
+    if not gallery_reloader.version:
+        raise RuntimeError(gallery_reloader.last_error or "the face gallery did not load")
+
+async def load_mongo_faces():
+    await asyncio.to_thread(face_sync.refresh, True)
+    rebuild_gallery()
+
+async def start_workers():
+    # Every worker imports dlib now rather than on the first upload it gets
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(executor, init_worker) for _ in range(RECOGNITION_WORKERS)))
+
+async def warm_up():
+    """
+    Loads the galleries and starts the worker processes while the routes are already up.
+
+    The watcher and pollers start first, so they keep running whatever happens
+    to the initial loads, and every step is retried until it succeeds.
+    """
+    global face_sync, sync_task, ready, startup_error
+    if FACES_WATCH_INTERVAL > 0:
+        gallery_reloader.watch([folder], interval=FACES_WATCH_INTERVAL)
+    if MONGO_FACES:
+        from db_config import FaceSync
+        face_sync = FaceSync(executor=executor)
+        sync_task = asyncio.create_task(sync_mongo_faces())
+        threading.Thread(target=watch_mongo_faces, daemon=True, name="mongo-face-watch").start()
+
+    # Workers first: both galleries are encoded on them
+    await retry_until_done(start_workers, "Starting the recognition workers")
+    await retry_until_done(load_gallery, "Loading the face gallery")
+    if MONGO_FACES:
+        await retry_until_done(load_mongo_faces, "Loading faces from MongoDB")
+    startup_error = None
+    ready = True
+    logger.info("Ready")
+
+@asynccontextmanager
+async def lifespan(app):
+    global warmup_task
+    start_executor()
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    if sync_task:
+        sync_task.cancel()
+    watch_stop.set()
+    executor.shutdown(cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,42 +163,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-known_faces = []
+@app.middleware("http")
+async def time_requests(request, call_next):
+    if request.url.path not in TIMED_ROUTES:
+        return await call_next(request)
+    started = time.perf_counter()
+    response = await call_next(request)
+    timer = REQUEST_SECONDS.labels(route=request.url.path, status=response.status_code)
+    body = response.body_iterator
 
-# Load known faces on startup
+    async def timed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            timer.observe(time.perf_counter() - started)
+
+    response.body_iterator = timed_body()
+    return response
+
+# Maximum distance for a gallery face to count as a match
+MATCH_THRESHOLD = float(os.environ.get("MATCH_THRESHOLD", "0.6"))
+
+# Known faces are loaded by warm_up(); only new or changed images are re-encoded
 folder = "faces"
-for filename in os.listdir(folder):
-    if filename.lower().endswith((".jpg", ".png")):
-        name = os.path.splitext(filename)[0].split("_")[0]
-        img_path = os.path.join(folder, filename)
-        image = face_recognition.load_image_file(img_path)
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_faces.append((name, encodings[0]))
+store = EmbeddingStore(os.environ.get("EMBEDDING_CACHE_DIR", "cache"))
+names, encodings = [], np.empty((0, ENCODING_DIM), dtype=np.float32)
+gallery = None
+gallery_lock = threading.Lock()
+
+def load_folder_faces():
+    # Photos are encoded on the worker processes, like uploads, never in the API process
+    return store.sync(folder, encode_first_file, executor=executor)
+
+def rebuild_gallery():
+    # Swapping the global is atomic, so requests in flight keep the gallery they started with
+    global gallery
+    with gallery_lock:
+        mongo_names, mongo_encodings = face_sync.gallery() if face_sync else ([], None)
+        if mongo_names:
+            gallery = FaceGallery(names + mongo_names, np.concatenate([encodings, mongo_encodings]))
+        else:
+            gallery = FaceGallery(names, encodings)
+    logger.info(f"Gallery holds {len(gallery)} encodings of {gallery.people} people")
+
+def install_folder_faces(folder_faces):
+    global names, encodings
+    folder_names, folder_encodings = folder_faces or ([], None)
+    with gallery_lock:
+        names = list(folder_names)
+        encodings = np.asarray(folder_encodings if folder_names else np.empty((0, ENCODING_DIM)), dtype=np.float32)
+    rebuild_gallery()
+
+# New enrollments in faces/ are encoded in the background and swapped in without a restart
+gallery_reloader = Reloader(load_folder_faces, install_folder_faces, name="face gallery")
+
+def require_gallery():
+    if gallery is None:
+        raise HTTPException(status_code=503, detail=startup_error or "Face gallery is still loading.")
+
+async def encode_upload(data):
+    loop = asyncio.get_running_loop()
+    ENCODES_IN_FLIGHT.inc()
+    try:
+        # Includes the wait for a free worker, which is what callers experience
+        with ENCODE_SECONDS.time():
+            return await loop.run_in_executor(executor, encode_image_bytes, data)
+    finally:
+        ENCODES_IN_FLIGHT.dec()
+
+def match_faces(encodings, threshold, top_k):
+    # Match every face in the upload against the whole gallery at once
+    with MATCH_SECONDS.time():
+        faces = gallery.match(encodings, threshold=threshold, top_k=top_k)
+    matches = [face["name"] for face in faces if face["name"] != "Unknown"]
+    return {"matches": matches if matches else ["Unknown"], "faces": faces}
 
 @app.post("/recognize")
-async def recognize_face(file: UploadFile = File(...)):
+async def recognize_face(
+    file: UploadFile = File(...),
+    threshold: float = Query(MATCH_THRESHOLD, gt=0),
+    top_k: int = Query(DEFAULT_TOP_K, ge=1),
+):
+    require_gallery()
     try:
-        image = np.frombuffer(await file.read(), np.uint8)
-        img = face_recognition.load_image_file(image)
-        encodings = face_recognition.face_encodings(img)
+        encodings = await encode_upload(await file.read())
 
         if not encodings:
             raise HTTPException(status_code=400, detail="No faces found.")
 
-        # Check each encoding against known faces
-        matches = []
-        for encoding in encodings:
-            for name, known_encoding in known_faces:
-                distance = np.linalg.norm(known_encoding - encoding)
-                if distance < 0.6:
-                    matches.append(name)
-
-        return {"matches": matches if matches else ["Unknown"]}
+        return match_faces(encodings, threshold, top_k)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/reload", status_code=202)
+async def reload_gallery():
+    # Requests keep matching against the current gallery until the new one is swapped in
+    gallery_reloader.reload_in_background()
+    return {"status": "reloading", "version": gallery_reloader.version}
+
+@app.get("/gallery")
+async def gallery_status():
+    return {
+        "version": gallery_reloader.version,
+        "reloading": gallery_reloader.reloading,
+        "error": gallery_reloader.last_error,
+        "encodings": len(gallery) if gallery else 0,
+        "people": gallery.people if gallery else 0,
+    }
+
+@app.get("/health")
+async def health():
+    # Liveness only: answers as soon as the process serves requests
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness():
+    if not ready:
+        return JSONResponse({"ready": False, "error": startup_error}, status_code=503)
+    return {"ready": True}
+
+@REGISTRY.collector
+def gallery_metrics():
+    yield "eduvision_ready", "gauge", "1 once the galleries are loaded and the workers started.", [({}, int(ready))]
+    if gallery is None:
+        return
+    yield "eduvision_gallery_encodings", "gauge", "Face encodings in the live gallery.", [({}, len(gallery))]
+    yield "eduvision_gallery_people", "gauge", "Distinct people in the live gallery.", [({}, gallery.people)]
+    yield "eduvision_gallery_version", "gauge", "Number of times the face gallery was reloaded.", [
+        ({}, gallery_reloader.version)]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def is_zip(upload):
+    return upload.content_type in ("application/zip", "application/x-zip-compressed") or \
+        (upload.filename or "").lower().endswith(".zip")
+
+def batch_too_large():
+    return HTTPException(
+        status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images and {MAX_BATCH_BYTES} bytes per batch."
+    )
+
+def extract_images(data, max_images=MAX_BATCH_IMAGES, max_bytes=MAX_BATCH_BYTES):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith((".jpg", ".jpeg", ".png"))
+        ]
+        # Judge the archive by its directory before inflating anything; read() stops at the declared size
+        if len(members) > max_images or sum(info.file_size for info in members) > max_bytes:
+            raise batch_too_large()
+        return [(info.filename, archive.read(info)) for info in members]
+
+@app.post("/recognize/batch")
+async def recognize_batch(
+    files: list[UploadFile] = File(...),
+    threshold: float = Query(MATCH_THRESHOLD, gt=0),
+    top_k: int = Query(DEFAULT_TOP_K, ge=1),
+):
+    """
+    Accepts many images (or zip archives of images) in one multipart request and
+    streams one JSON line per image as soon as its encoding finishes.
+    """
+    require_gallery()
+    images = []
+    total = 0
+    for upload in files:
+        # Stop at the first upload past either limit instead of reading the rest
+        if len(images) >= MAX_BATCH_IMAGES or (upload.size or 0) > MAX_BATCH_BYTES - total:
+            raise batch_too_large()
+        data = await upload.read()
+        if is_zip(upload):
+            try:
+                members = await asyncio.to_thread(
+                    extract_images, data, MAX_BATCH_IMAGES - len(images), MAX_BATCH_BYTES - total
+                )
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"{upload.filename} is not a valid zip file.")
+            images.extend(members)
+            total += sum(len(member) for _, member in members)
+        else:
+            images.append((upload.filename, data))
+            total += len(data)
+        if total > MAX_BATCH_BYTES:
+            raise batch_too_large()
+
+    if not images:
+        raise HTTPException(status_code=400, detail="No images uploaded.")
+
+    async def recognize_one(filename, data):
+        try:
+            encodings = await encode_upload(data)
+        except Exception as e:
+            return {"filename": filename, "error": str(e)}
+        if not encodings:
+            return {"filename": filename, "error": "No faces found."}
+        return {"filename": filename, **match_faces(encodings, threshold, top_k)}
+
+    async def stream():
+        for result in asyncio.as_completed([recognize_one(name, data) for name, data in images]):
+            yield json.dumps(await result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001)
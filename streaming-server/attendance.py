@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger("attendance")
+
+# kind is "in" once a person has been seen for long enough, "out" once they have been gone for long enough
+PresenceEvent = namedtuple("PresenceEvent", "kind person room time")
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class _Presence:
+    def __init__(self, now):
+        self.frames = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.present = False
+
+
+class PresenceTracker:
+    """
+    Debounces per-frame identifications into presence events per person and room.
+
+    observe(room, names) is called with the names recognized in one analyzed
+    frame. A person counts as arrived once seen in min_frames frames with no
+    gap longer than max_gap seconds between them (the "in" event carries the
+    first of those sightings), and as gone once not seen for absent_after
+    seconds (the "out" event carries the last sighting). A single
+    misidentified frame therefore never becomes an event. Events are returned
+    and also passed to on_events, if given.
+    """
+
+    def __init__(self, min_frames=5, max_gap=2.0, absent_after=120.0, on_events=None):
+        self.min_frames = min_frames
+        self.max_gap = max_gap
+        self.absent_after = absent_after
+        self.on_events = on_events
+        self.state = {}  # (person, room) -> _Presence
+        self._lock = threading.Lock()
+
+    def observe(self, room, names, now=None):
+        now = time.time() if now is None else now
+        events = []
+        with self._lock:
+            for person in set(names) - {"Unknown"}:
+                state = self.state.get((person, room))
+                if state is None or (not state.present and now - state.last_seen > self.max_gap):
+                    state = self.state[(person, room)] = _Presence(now)
+                state.frames += 1
+                state.last_seen = now
+                if not state.present and state.frames >= self.min_frames:
+                    state.present = True
+                    events.append(PresenceEvent("in", person, room, state.first_seen))
+            events.extend(self._expire(now))
+        if events and self.on_events:
+            self.on_events(events)
+        return events
+
+    def expire(self, now=None):
+        """Ends presences that have timed out without waiting for the next frame."""
+        with self._lock:
+            events = self._expire(time.time() if now is None else now)
+        if events and self.on_events:
+            self.on_events(events)
+        return events
+
+    def _expire(self, now):
+        events = []
+        for key, state in list(self.state.items()):
+            if state.present and now - state.last_seen > self.absent_after:
+                events.append(PresenceEvent("out", *key, state.last_seen))
+                del self.state[key]
+            elif not state.present and now - state.last_seen > self.max_gap:
+                del self.state[key]
+        return events
+
+
+def _event_id(event):
+    return f"{event.kind}:{event.person}:{event.room}:{event.time!r}"
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+class AttendanceWriter:
+    """
+    Buffers presence events and writes them to MongoDB in bulk on a timer.
+
+    Each flush upserts the raw events into the events collection, keyed on an
+    _id derived from the event so a retried flush never stores one twice, and
+    turns them into upserts on the backend's attendance logs (the
+    AttendanceLogs Log model), all in one bulk_write. Person names are
+    the instructors' user IDs, as the dataset folders are. An "in" event
+    during one of that instructor's scheduled classes in the room creates the
+    day's log for the schedule with timeIn, status "present" (or "late" once
+    late_after minutes past the start) and the instructor's college and
+    course; an earlier timeIn replaces a later one. An "out" event sets
+    timeout on an existing log. Arrivals up to early_by minutes before class
+    count for it. Events that match no schedule are kept in the events
+    collection only.
+    """
+
+    def __init__(self, database, events_collection=None, flush_interval=10.0, late_after=15, early_by=15):
+        self.database = database
+        self.events = events_collection
+        self.flush_interval = flush_interval
+        self.late_after = late_after
+        self.early_by = early_by
+        self.pending = []
+        self.written = 0
+        self.unmatched = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add(self, events):
+        with self._lock:
+            self.pending.extend(events)
+
+    def start(self, before_flush=None):
+        """Flushes every flush_interval seconds on a background thread, calling before_flush() first."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(before_flush,), daemon=True,
+                                            name="attendance-writer")
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+        self.flush()
+
+    def _run(self, before_flush):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                if before_flush:
+                    before_flush()
+                self.flush()
+            except Exception:
+                logger.exception("Attendance flush failed, will retry")
+
+    def _schedules(self, events):
+        """Schedules of the instructors in events for their rooms, grouped by (instructor ID, room)."""
+        instructors = {ObjectId(event.person) for event in events if ObjectId.is_valid(event.person)}
+        if not instructors:
+            return {}, {}
+        rooms = {event.room for event in events}
+        schedules = {}
+        query = {"instructor": {"$in": list(instructors)}, "room": {"$in": list(rooms)}}
+        for schedule in self.database["schedules"].find(query):
+            schedules.setdefault((str(schedule["instructor"]), schedule["room"]), []).append(schedule)
+        users = {
+            str(user["_id"]): user
+            for user in self.database["users"].find({"_id": {"$in": list(instructors)}}, {"college": 1, "course": 1})
+        }
+        return schedules, users
+
+    def _match(self, schedules, when, kind):
+        date = when.strftime("%Y-%m-%d")
+        day = DAYS[when.weekday()]
+        minute = when.hour * 60 + when.minute
+        for schedule in schedules:
+            if not schedule.get("days", {}).get(day):
+                continue
+            if not schedule.get("semesterStartDate", "") <= date <= schedule.get("semesterEndDate", "9999"):
+                continue
+            start, end = _minutes(schedule["startTime"]), _minutes(schedule["endTime"])
+            # Leaving may be noticed a little after class ends, arriving a little before it starts
+            if start - self.early_by <= minute <= end + (self.early_by if kind == "out" else 0):
+                return schedule, start
+        return None, None
+
+    def flush(self):
+        """Writes every buffered event; returns the number of attendance log writes."""
+        with self._lock:
+            events, self.pending = self.pending, []
+        if not events:
+            return 0
+        try:
+            return self._write(events)
+        except Exception:
+            # Keep them for the next flush; rewriting is harmless, events upsert on their _id and
+            # logs only move timeIn earlier and timeout later
+            with self._lock:
+                self.pending[:0] = events
+            raise
+
+    def _write(self, events):
+        if self.events is not None:
+            self.events.bulk_write([
+                ReplaceOne({"_id": _event_id(event)},
+                           {**event._asdict(), "time": datetime.fromtimestamp(event.time)}, upsert=True)
+                for event in events
+            ], ordered=False)
+
+        schedules, users = self._schedules(events)
+        operations = []
+        unmatched = 0
+        for event in sorted(events, key=lambda event: event.time):
+            when = datetime.fromtimestamp(event.time)
+            schedule, start = self._match(schedules.get((event.person, event.room), []), when, event.kind)
+            user = users.get(event.person)
+            if schedule is None or user is None:
+                unmatched += 1
+                continue
+            log = {"schedule": schedule["_id"], "date": when.strftime("%Y-%m-%d")}
+            if event.kind == "in":
+                late = when.hour * 60 + when.minute > start + self.late_after
+                operations.append(UpdateOne(log, {
+                    "$min": {"timeIn": when.strftime("%H:%M")},
+                    "$setOnInsert": {
+                        "status": "late" if late else "present",
+                        "college": user.get("college"),
+                        "course": user.get("course", ""),
+                    },
+                }, upsert=True))
+            else:
+                operations.append(UpdateOne(log, {"$max": {"timeout": when.strftime("%H:%M")}}))
+
+        if operations:
+            # Ordered, so a person's "in" lands before their "out" from the same batch
+            self.database["logs"].bulk_write(operations, ordered=True)
+            self.written += len(operations)
+        self.unmatched += unmatched
+        logger.info(f"Flushed {len(events)} presence event(s), {len(operations)} attendance log write(s)")
+        return len(operations)
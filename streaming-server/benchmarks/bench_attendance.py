@@ -0,0 +1,132 @@
+"""
+Attendance pipeline: MongoDB writes and flush latency for a simulated school day.
+
+Replays detect-rate identifications for several rooms through PresenceTracker
+and AttendanceWriter against a local mongod (MONGO_URI), in a throwaway
+database that is dropped afterwards. Every person attends one class per room
+with noisy detections: missed frames and occasional misidentifications.
+Reports itself as skipped when no server answers; --mongomock runs it
+in-memory instead.
+
+    python benchmarks/bench_attendance.py --rooms 4 16 --people 30 --hours 2
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from common import emit, percentile_summary
+
+
+def seed(database, rooms, people, day):
+    database["users"].insert_many([
+        {"_id": person, "college": ObjectId(), "course": "BSIT"} for person in people
+    ])
+    database["schedules"].insert_many([
+        {
+            "instructor": person, "room": room, "startTime": "08:00", "endTime": "10:00",
+            "semesterStartDate": "2000-01-01", "semesterEndDate": "2999-12-31",
+            "days": {day: True},
+        }
+        for room in rooms for person in people
+    ])
+
+
+def measure(database, events_collection, room_count, people_count, hours, detect_fps, flush_interval, miss_rate):
+    from attendance import DAYS, AttendanceWriter, PresenceTracker
+
+    rng = random.Random(0)
+    rooms = [f"room{i}" for i in range(room_count)]
+    people = [ObjectId() for _ in range(people_count)]
+    start = datetime.now().replace(hour=7, minute=50, second=0, microsecond=0)
+    seed(database, rooms, people, DAYS[start.weekday()])
+
+    writer = AttendanceWriter(database, events_collection, flush_interval=flush_interval)
+    presence = PresenceTracker(min_frames=10, absent_after=120, on_events=writer.add)
+    # Each person is in view of each room's camera for a random stretch of the class
+    visits = {
+        (room, person): (rng.uniform(0, 1800), rng.uniform(1800, hours * 3600))
+        for room in rooms for person in people
+    }
+
+    identifications = 0
+    flush_ms = []
+    now = start.timestamp()
+    next_flush = now + flush_interval
+    for step in range(int(hours * 3600 * detect_fps)):
+        offset = step / detect_fps
+        for room in rooms:
+            names = [
+                str(person) for person in people
+                if visits[room, person][0] <= offset <= visits[room, person][1] and rng.random() > miss_rate
+            ]
+            if rng.random() < 0.01:
+                names.append(str(rng.choice(people)))  # a misidentification
+            identifications += len(names)
+            presence.observe(room, names, now + offset)
+        if now + offset >= next_flush:
+            presence.expire(now + offset)
+            started = time.perf_counter()
+            writer.flush()
+            flush_ms.append((time.perf_counter() - started) * 1000)
+            next_flush += flush_interval
+    presence.expire(now + hours * 3600 + 3600)
+    writer.flush()
+
+    logs = database["logs"].count_documents({})
+    return {
+        "bench": "attendance",
+        "rooms": room_count,
+        "people": people_count,
+        "simulated_hours": hours,
+        "identifications": identifications,
+        "log_writes": writer.written,
+        "logs": logs,
+        "complete_logs": database["logs"].count_documents({"timeIn": {"$exists": True}, "timeout": {"$exists": True}}),
+        "unmatched_events": writer.unmatched,
+        "writes_per_identification": writer.written / identifications if identifications else 0.0,
+        "flushes": len(flush_ms),
+        **{f"flush_{key}": value for key, value in percentile_summary(flush_ms).items() if key != "count"},
+    }
+
+
+def run(rooms=(4, 16), people=30, hours=2.0, detect_fps=2.0, flush_interval=10.0, miss_rate=0.3, mongomock=False):
+    if mongomock:
+        import mongomock as mongo
+        client = mongo.MongoClient()
+    else:
+        from pymongo import MongoClient
+        from pymongo.errors import ServerSelectionTimeoutError
+        client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"), serverSelectionTimeoutMS=2000)
+        try:
+            client.admin.command("ping")
+        except ServerSelectionTimeoutError:
+            return [{"bench": "attendance", "skipped": "no MongoDB server at MONGO_URI"}]
+
+    rows = []
+    for room_count in rooms:
+        name = f"eduvision_bench_{os.getpid()}"
+        try:
+            rows.append(measure(client[name], client[name]["recognition_events"], room_count, people, hours,
+                                detect_fps, flush_interval, miss_rate))
+        finally:
+            client.drop_database(name)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--people", type=int, default=30, help="people per room")
+    parser.add_argument("--hours", type=float, default=2.0, help="simulated time")
+    parser.add_argument("--detect-fps", type=float, default=2.0, help="analyzed frames per second per room")
+    parser.add_argument("--mongomock", action="store_true", help="use an in-memory mongomock server")
+    args = parser.parse_args()
+    emit(run(args.rooms, args.people, args.hours, args.detect_fps, mongomock=args.mongomock))
+
+
+if __name__ == "__main__":
+    main()
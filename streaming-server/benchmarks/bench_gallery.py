@@ -0,0 +1,71 @@
+"""
+Gallery matching benchmark: per-pair Python loop vs. the vectorized FaceGallery.
+
+Runs on synthetic 128-d encodings so it needs neither dlib nor the faces/ folder.
+
+    python benchmarks/bench_gallery.py --sizes 100 1000 10000 --probes 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import emit
+from gallery import FaceGallery, ENCODING_DIM
+
+
+def loop_match(known_faces, encodings, threshold=0.6):
+    # The original /recognize matching loop
+    matches = []
+    for encoding in encodings:
+        for name, known_encoding in known_faces:
+            if np.linalg.norm(known_encoding - encoding) < threshold:
+                matches.append(name)
+    return matches
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes=(100, 1000, 5000, 20000), probes=4, shots=5, repeat=5, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        encodings = rng.normal(scale=0.1, size=(size, ENCODING_DIM))
+        names = [f"person{i // shots}" for i in range(size)]
+        batch = rng.normal(scale=0.1, size=(probes, ENCODING_DIM))
+
+        gallery = FaceGallery(names, encodings)
+        known_faces = list(zip(names, encodings))
+        row = {
+            "bench": "gallery",
+            "gallery_size": size,
+            "people": gallery.people,
+            "probes": probes,
+            "loop_ms": timed(lambda: loop_match(known_faces, batch), repeat) * 1000,
+            "vectorized_ms": timed(lambda: gallery.match(batch), repeat) * 1000,
+        }
+        row["speedup"] = row["loop_ms"] / row["vectorized_ms"]
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--probes", type=int, default=4, help="faces per request")
+    parser.add_argument("--shots", type=int, default=5, help="enrolled images per person")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    emit(run(args.sizes, args.probes, args.shots, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+/recognize latency and throughput across gallery sizes and client concurrency.
+
+Runs the FastAPI app in-process over ASGI, uploading the bundled faces/ photos.
+The gallery is padded with synthetic encodings up to each size. Needs
+face_recognition (dlib); reports itself as skipped without it.
+
+    python benchmarks/bench_recognize.py --sizes 100 1000 10000 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import FACES_DIR, ROOT, emit, percentile_summary
+
+
+def load_service():
+    os.environ.setdefault("EMBEDDING_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+    os.environ["FACES_WATCH_INTERVAL"] = "0"
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+async def measure(service, sizes, concurrency, requests):
+    import httpx
+    from gallery import ENCODING_DIM, FaceGallery
+
+    uploads = [open(os.path.join(FACES_DIR, name), "rb").read() for name in sorted(os.listdir(FACES_DIR))]
+    rng = np.random.default_rng(0)
+    rows = []
+
+    async with service.lifespan(service.app):
+        await service.warmup_task
+        base_names, base_encodings = list(service.names), np.asarray(service.encodings)
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for size in sizes:
+                pad = max(0, size - len(base_names))
+                service.gallery = FaceGallery(
+                    base_names + [f"synthetic{i // 5}" for i in range(pad)],
+                    np.concatenate([base_encodings, rng.normal(scale=0.1, size=(pad, ENCODING_DIM))]),
+                )
+                for clients in concurrency:
+                    latencies = []
+                    limit = asyncio.Semaphore(clients)
+
+                    async def one(i):
+                        async with limit:
+                            started = time.perf_counter()
+                            response = await client.post(
+                                "/recognize", files={"file": ("face.jpg", uploads[i % len(uploads)], "image/jpeg")}
+                            )
+                            latencies.append((time.perf_counter() - started) * 1000)
+                            response.raise_for_status()
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*(one(i) for i in range(requests)))
+                    wall = time.perf_counter() - started
+                    rows.append({
+                        "bench": "recognize",
+                        "gallery_size": len(service.gallery),
+                        "concurrency": clients,
+                        "requests": requests,
+                        "throughput_rps": requests / wall,
+                        **percentile_summary(latencies),
+                    })
+    return rows
+
+
+def run(sizes=(100, 1000, 10000), concurrency=(1, 4, 16), requests=32):
+    try:
+        import face_recognition  # noqa: F401
+    except ImportError:
+        return [{"bench": "recognize", "skipped": "face_recognition is not installed"}]
+    return asyncio.run(measure(load_service(), sizes, concurrency, requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="requests per measurement")
+    args = parser.parse_args()
+    emit(run(args.sizes, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Service startup: import time, time to first response and time to ready.
+
+Each service is started in a fresh interpreter, as a supervisor would
+restart it. The child times its own import, its first /health response and
+the first 200 from /ready, all measured from the moment the interpreter
+started running the script. process_ms is the whole run as seen from
+outside, including interpreter start. face_recog.py uses a throwaway model
+trained from dataset/. app.py only becomes ready with face_recognition
+installed; without it, ready_ms is reported as null with the error.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import DATASET_DIR, ROOT, emit
+
+# Runs inside the child; the module and its client code are filled in per service
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import {module} as service
+imported = time.perf_counter()
+{client}
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (first - started) * 1000,
+    "ready_ms": None if ready is None else (ready - started) * 1000,
+    "error": error,
+}}))
+"""
+
+# Each client sets first (time of the first /health answer), ready and error
+WSGI_CLIENT = """
+client = service.app.test_client()
+client.get("/health")
+first = time.perf_counter()
+ready, error = None, None
+deadline = first + {timeout}
+while time.perf_counter() < deadline:
+    response = client.get("/ready")
+    if response.status_code == 200:
+        ready = time.perf_counter()
+        break
+    error = response.get_json().get("error")
+    time.sleep(0.01)
+"""
+
+ASGI_CLIENT = """
+from fastapi.testclient import TestClient
+with TestClient(service.app) as client:
+    client.get("/health")
+    first = time.perf_counter()
+    ready, error = None, None
+    deadline = first + {timeout}
+    while time.perf_counter() < deadline:
+        response = client.get("/ready")
+        if response.status_code == 200:
+            ready = time.perf_counter()
+            break
+        error = response.json().get("error")
+        if error:
+            break
+        time.sleep(0.01)
+"""
+
+AIOHTTP_CLIENT = """
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+
+async def probe():
+    async with TestClient(TestServer(await service.init_app())) as client:
+        await client.get("/health")
+        first = time.perf_counter()
+        response = await client.get("/ready")
+        return first, time.perf_counter() if response.status == 200 else None
+
+first, ready = asyncio.run(probe())
+error = None
+"""
+
+
+def start_once(module, client, cwd, env, timeout):
+    code = CHILD.format(root=ROOT, module=module, client=client.format(timeout=timeout))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True,
+                            timeout=timeout + 60)
+    process_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} failed to start:\n{result.stderr[-2000:]}")
+    row = json.loads(result.stdout.strip().splitlines()[-1])
+    row["process_ms"] = process_ms
+    return row
+
+
+def median_row(service, rows):
+    summary = {"bench": "startup", "service": service, "runs": len(rows)}
+    for key in ("import_ms", "first_response_ms", "ready_ms", "process_ms"):
+        values = [row[key] for row in rows if row[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    summary["error"] = rows[-1]["error"] if summary["ready_ms"] is None else None
+    return summary
+
+
+def run(repeat=3, timeout=60.0):
+    from train_faces import train
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        service_dir = os.path.join(tmp, "streaming-server")
+        shutil.copytree(DATASET_DIR, os.path.join(service_dir, "dataset"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            train(
+                data_dir=os.path.join(service_dir, "dataset"),
+                trainer_path=os.path.join(service_dir, "trainer.yml"),
+                labels_path=os.path.join(service_dir, "labels.json"),
+            )
+
+        env = {
+            **os.environ,
+            "MODEL_WATCH_INTERVAL": "0",
+            "FACES_WATCH_INTERVAL": "0",
+            "CAMERAS_CONFIG": os.path.join(service_dir, "no-cameras.json"),
+            "EMBEDDING_CACHE_DIR": os.path.join(tmp, "cache"),
+        }
+        services = [
+            ("face_recog", WSGI_CLIENT, tmp),
+            ("app", ASGI_CLIENT, ROOT),
+            ("rtsp_to_webrtc", AIOHTTP_CLIENT, ROOT),
+        ]
+        for module, client, cwd in services:
+            runs = [start_once(module, client, cwd, env, timeout) for _ in range(repeat)]
+            rows.append(median_row(module, runs))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh starts per service (median reported)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for /ready")
+    args = parser.parse_args()
+    emit(run(args.repeat, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
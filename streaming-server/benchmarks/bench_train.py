@@ -0,0 +1,72 @@
+"""
+train_faces.py wall time: full retrain vs. enrolling one new person.
+
+Copies the bundled dataset/ into a temp dir, optionally replicated to simulate
+a larger enrollment, so the real model and label map are never touched.
+Enrolling retrains from scratch; most of either run is writing the model YAML,
+which LBPH's update() would also have to read back first.
+
+    python benchmarks/bench_train.py --copies 1 10 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from common import DATASET_DIR, emit
+
+
+def build_dataset(root, copies):
+    people = [name for name in sorted(os.listdir(DATASET_DIR)) if os.path.isdir(os.path.join(DATASET_DIR, name))]
+    for i in range(copies):
+        for name in people:
+            shutil.copytree(os.path.join(DATASET_DIR, name), os.path.join(root, f"{name}-{i}"))
+    return people
+
+
+def timed_train(**kwargs):
+    from train_faces import train
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        added = train(**kwargs)
+    return added, time.perf_counter() - started
+
+
+def run(copies=(1, 10), workers=None):
+    rows = []
+    for count in copies:
+        with tempfile.TemporaryDirectory(prefix="bench-train-") as tmp:
+            data_dir = os.path.join(tmp, "dataset")
+            os.makedirs(data_dir)
+            people = build_dataset(data_dir, count)
+            paths = {
+                "data_dir": data_dir,
+                "trainer_path": os.path.join(tmp, "trainer.yml"),
+                "labels_path": os.path.join(tmp, "labels.json"),
+                "workers": workers,
+            }
+
+            added, seconds = timed_train(full=True, **paths)
+            rows.append({"bench": "train", "mode": "full", "people": len(people) * count, "images": added, "seconds": seconds})
+
+            # Enroll one more student the way user_picture.py would
+            shutil.copytree(os.path.join(DATASET_DIR, people[0]), os.path.join(data_dir, "new-student"))
+            added, seconds = timed_train(**paths)
+            rows.append({"bench": "train", "mode": "enroll", "people": len(people) * count + 1, "images": added, "seconds": seconds})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 10], help="times to replicate dataset/")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    emit(run(args.copies, args.workers))
+
+
+if __name__ == "__main__":
+    main()
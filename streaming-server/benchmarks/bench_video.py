@@ -0,0 +1,124 @@
+"""
+MJPEG video_feed throughput: encoded FPS per stream and delivered FPS per viewer.
+
+Builds face_recog.py's real pipelines (Haar + tracker + LBPH trained on the
+bundled dataset/) on a synthetic video played at camera rate by
+LoopingCapture, then pulls generate_frames() from several viewer threads.
+
+    python benchmarks/bench_video.py --streams 1 2 --viewers 1 4 16 --quality high low --duration 5
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common import DATASET_DIR, LoopingCapture, emit, make_synthetic_video
+
+
+def load_service(workdir):
+    """Imports face_recog.py against a throwaway model trained from dataset/."""
+    from train_faces import train
+
+    service_dir = os.path.join(workdir, "streaming-server")
+    shutil.copytree(DATASET_DIR, os.path.join(service_dir, "dataset"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        train(
+            data_dir=os.path.join(service_dir, "dataset"),
+            trainer_path=os.path.join(service_dir, "trainer.yml"),
+            labels_path=os.path.join(service_dir, "labels.json"),
+        )
+
+    os.environ["MODEL_WATCH_INTERVAL"] = "0"
+    os.environ["CAMERAS_CONFIG"] = os.path.join(service_dir, "no-cameras.json")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import face_recog
+        face_recog.startup()
+        while face_recog.model is None:
+            if face_recog.model_reloader.last_error:
+                raise RuntimeError(face_recog.model_reloader.last_error)
+            time.sleep(0.05)
+    finally:
+        os.chdir(cwd)
+    return face_recog
+
+
+def watch(service, pipeline, deadline, counts, sizes, index, quality):
+    # Viewers here never fall behind, so the profile is pinned to keep rows comparable
+    frames = service.generate_frames(pipeline, quality=quality, adaptive=False)
+    for chunk in frames:
+        counts[index] += 1
+        sizes[index] += len(chunk)
+        if time.monotonic() >= deadline:
+            break
+    frames.close()
+
+
+def run(streams=(1, 2), viewers=(1, 4, 16), qualities=("high",), duration=5.0, warmup=1.0):
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench-video-") as tmp:
+        service = load_service(tmp)
+        video = make_synthetic_video(os.path.join(tmp, "classroom.avi"))
+
+        for stream_count, viewer_count, quality in itertools.product(streams, viewers, qualities):
+            pipelines = [service.create_pipeline(video, open_capture=LoopingCapture) for _ in range(stream_count)]
+            for pipeline in pipelines:
+                pipeline.start()
+            time.sleep(warmup)
+
+            encoded_before = [pipeline.encoded for pipeline in pipelines]
+            counts = [0] * (stream_count * viewer_count)
+            sizes = [0] * len(counts)
+            deadline = time.monotonic() + duration
+            cpu_before = time.process_time()
+            threads = [
+                threading.Thread(
+                    target=watch,
+                    args=(service, pipelines[i // viewer_count], deadline, counts, sizes, i, quality),
+                )
+                for i in range(len(counts))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            cpu = time.process_time() - cpu_before
+
+            encoded = [pipeline.encoded - before for pipeline, before in zip(pipelines, encoded_before)]
+            rows.append({
+                "bench": "video_feed",
+                "streams": stream_count,
+                "viewers_per_stream": viewer_count,
+                "quality": quality,
+                "duration_s": duration,
+                "encoded_fps_per_stream": sum(encoded) / stream_count / duration,
+                "delivered_fps_per_viewer": sum(counts) / len(counts) / duration,
+                "min_viewer_fps": min(counts) / duration,
+                "kbytes_per_s_per_viewer": sum(sizes) / len(sizes) / duration / 1024,
+                "cpu_percent": cpu / duration * 100,
+                "recognition_dropped": service.recognition_pool.dropped,
+            })
+            for pipeline in pipelines:
+                pipeline.stop()
+        service.recognition_pool.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--quality", nargs="+", default=["high"], help="output profiles to measure")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    args = parser.parse_args()
+    emit(run(args.streams, args.viewers, args.quality, args.duration))
+
+
+if __name__ == "__main__":
+    main()
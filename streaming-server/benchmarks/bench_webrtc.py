@@ -0,0 +1,81 @@
+"""
+RTSPVideoTrack.recv frame time for several peers sharing one camera relay.
+
+A synthetic video played at camera rate by LoopingCapture stands in for the
+RTSP camera. aiortc's 30 fps pacing in next_timestamp is bypassed so the
+numbers are the per-frame work of recv itself.
+
+    python benchmarks/bench_webrtc.py --peers 1 4 16 --frames 300
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from common import LoopingCapture, emit, make_synthetic_video, percentile_summary
+
+
+async def measure(video, peers, frames):
+    from aiortc.mediastreams import VIDEO_TIME_BASE
+    from rtsp_to_webrtc import RTSPRelay
+    from rtsp_track import RTSPVideoTrack
+
+    class UnpacedTrack(RTSPVideoTrack):
+        async def next_timestamp(self):
+            self._bench_pts = getattr(self, "_bench_pts", -3000) + 3000
+            return self._bench_pts, VIDEO_TIME_BASE
+
+    RTSPRelay.open_capture = LoopingCapture
+    rows = []
+    for peer_count in peers:
+        tracks = [UnpacedTrack(video) for _ in range(peer_count)]
+        relay = tracks[0].relay
+        while relay.frames.seq == 0:
+            await asyncio.sleep(0.01)
+
+        samples = []
+        started = time.perf_counter()
+        for _ in range(frames):
+            for track in tracks:
+                t = time.perf_counter()
+                await track.recv()
+                samples.append((time.perf_counter() - t) * 1000)
+        wall = time.perf_counter() - started
+
+        stats = relay.stats
+        rows.append({
+            "bench": "webrtc_recv",
+            "peers": peer_count,
+            "frames_per_peer": frames,
+            "relay_sessions": len(RTSPRelay.relays),
+            "read_ms": stats["avg_read_ms"],
+            "convert_ms": stats["avg_convert_ms"],
+            "recv_frames_per_s": frames * peer_count / wall,
+            **percentile_summary(samples),
+        })
+        for track in tracks:
+            track.stop()
+    return rows
+
+
+def run(peers=(1, 4, 16), frames=300):
+    try:
+        import aiortc  # noqa: F401
+    except ImportError:
+        return [{"bench": "webrtc_recv", "skipped": "aiortc is not installed"}]
+    with tempfile.TemporaryDirectory(prefix="bench-webrtc-") as tmp:
+        video = make_synthetic_video(os.path.join(tmp, "camera.avi"))
+        return asyncio.run(measure(video, peers, frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--peers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--frames", type=int, default=300, help="recv calls per peer")
+    args = parser.parse_args()
+    emit(run(args.peers, args.frames))
+
+
+if __name__ == "__main__":
+    main()
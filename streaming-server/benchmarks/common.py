@@ -0,0 +1,103 @@
+"""Shared helpers for the streaming-server benchmarks."""
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# The services import each other as top-level modules from streaming-server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FACES_DIR = os.path.join(ROOT, "faces")
+DATASET_DIR = os.path.join(ROOT, "dataset")
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def percentile_summary(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if not len(samples):
+        return {"count": 0}
+    return {
+        "count": int(len(samples)),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "max_ms": float(samples.max()),
+    }
+
+
+def make_synthetic_video(path, frames=300, size=(640, 480), fps=30):
+    """Writes an MJPG video that slowly pans across the bundled faces/ photos."""
+    width, height = size
+    photos = [
+        cv2.resize(cv2.imread(os.path.join(FACES_DIR, name)), (width, height))
+        for name in sorted(os.listdir(FACES_DIR))
+    ]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        photo = photos[(i // 60) % len(photos)]
+        writer.write(np.roll(photo, (i % 60) * 2, axis=1))
+    writer.release()
+    return path
+
+
+class LoopingCapture:
+    """
+    cv2.VideoCapture stand-in for a camera: plays a file at its native frame
+    rate and loops at the end instead of reporting a failed read.
+    """
+
+    def __init__(self, source, fps=None):
+        self.cap = cv2.VideoCapture(source)
+        self.interval = 1.0 / (fps or self.cap.get(cv2.CAP_PROP_FPS) or 30)
+        self.next_frame = time.monotonic()
+        self._frame = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def grab(self):
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame + self.interval, time.monotonic() - self.interval)
+        if not self.cap.grab():
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return self.cap.grab()
+        return True
+
+    def retrieve(self):
+        return self.cap.retrieve()
+
+    def read(self):
+        return self.retrieve() if self.grab() else (False, None)
+
+    def release(self):
+        self.cap.release()
+
+
+def emit(rows, output=None):
+    """Prints one JSON object per line and optionally appends them to output."""
+    for row in rows:
+        line = json.dumps(row)
+        print(line)
+        if output:
+            with open(output, "a") as f:
+                f.write(line + "\n")
@@ -0,0 +1,80 @@
+"""
+Runs every streaming-server benchmark and saves one machine-readable report.
+
+The report is a JSON document with the environment and one row per
+measurement, written to benchmarks/results/<UTC timestamp>.json unless
+--output is given. Benchmarks whose optional dependencies are missing report
+themselves as skipped instead of failing the run.
+
+    python benchmarks/run_all.py            # full run
+    python benchmarks/run_all.py --quick    # smaller sizes, for CI smoke checks
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+
+import bench_attendance
+import bench_gallery
+import bench_recognize
+import bench_startup
+import bench_train
+import bench_video
+import bench_webrtc
+from common import environment
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+FULL = {
+    "gallery": lambda: bench_gallery.run(),
+    "recognize": lambda: bench_recognize.run(),
+    "video_feed": lambda: bench_video.run(qualities=("high", "low")),
+    "webrtc_recv": lambda: bench_webrtc.run(),
+    "train": lambda: bench_train.run(),
+    "attendance": lambda: bench_attendance.run(),
+    "startup": lambda: bench_startup.run(),
+}
+
+QUICK = {
+    "gallery": lambda: bench_gallery.run(sizes=(100, 1000), repeat=3),
+    "recognize": lambda: bench_recognize.run(sizes=(100,), concurrency=(1, 4), requests=8),
+    "video_feed": lambda: bench_video.run(streams=(1,), viewers=(1, 4), duration=2.0),
+    "webrtc_recv": lambda: bench_webrtc.run(peers=(1, 4), frames=60),
+    "train": lambda: bench_train.run(copies=(1,)),
+    "attendance": lambda: bench_attendance.run(rooms=(2,), people=10, hours=0.5),
+    "startup": lambda: bench_startup.run(repeat=1),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--only", nargs="+", choices=sorted(FULL), help="run a subset")
+    parser.add_argument("--output", help="report path")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    suite = QUICK if args.quick else FULL
+    started = datetime.datetime.now(datetime.timezone.utc)
+    report = {
+        "started": started.isoformat(),
+        "quick": args.quick,
+        "environment": environment(),
+        "results": [],
+    }
+    for name, bench in suite.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name}...")
+        report["results"].extend(bench())
+
+    output = args.output or os.path.join(RESULTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(report['results'])} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,120 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import gridfs
+import logging
+import numpy as np
 import os
+import threading
 
-MONGO_URI = "mongodb://localhost:27017"
+from gallery import ENCODING_DIM
+from recognition_worker import encode_first_face
+
+logger = logging.getLogger("db_config")
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = "face_recognition"
 COLLECTION_NAME = "faces"
+EVENTS_COLLECTION_NAME = "recognition_events"
+# The backend's database, where attendance logs, schedules and users live
+ATTENDANCE_DB_NAME = os.environ.get("ATTENDANCE_DB", "eduvision")
 
 client = MongoClient(MONGO_URI)
 db = client[DB_NAME]
 fs = gridfs.GridFS(db)
+attendance_db = client[ATTENDANCE_DB_NAME]
+
+class FaceSync:
+    """
+    Mirrors the faces collection into an in-memory (names, encodings) gallery.
+
+    Images are decoded straight from the GridFS stream, never through temp
+    files, and encoded in parallel on the given executor (serially without
+    one). Each encoding is saved back on its document next to the file_id it
+    was computed from, so later loads only decode photos that are new or were
+    replaced. refresh() picks up documents newer than the last one seen;
+    refresh(full=True) also notices edits and deletions, and watch() follows a
+    change stream (replica set required) for immediate updates.
+    """
+
+    def __init__(self, database=db, executor=None):
+        self.collection = database[COLLECTION_NAME]
+        self.fs = gridfs.GridFS(database)
+        self.executor = executor
+        self.entries = {}  # _id -> (name, encoding)
+        self.last_id = None
+        self._lock = threading.Lock()
+
+    def _read(self, doc):
+        try:
+            return self.fs.get(doc["file_id"]).read()
+        except Exception:
+            logger.exception(f"Can't read the photo of face {doc['_id']} from GridFS, skipping it")
+            return None
+
+    def _encode(self, docs):
+        # A photo that is missing or won't decode is saved with no encoding too, so it isn't retried
+        stale = [doc for doc in docs if doc.get("encoding_file_id") != doc["file_id"]]
+        if stale:
+            blobs = [self._read(doc) for doc in stale]
+            if self.executor:
+                pending = [None if blob is None else self.executor.submit(encode_first_face, blob) for blob in blobs]
+            updates = []
+            for i, doc in enumerate(stale):
+                encoding = None
+                if blobs[i] is not None:
+                    try:
+                        encoding = pending[i].result() if self.executor else encode_first_face(blobs[i])
+                    except Exception:
+                        logger.exception(f"Can't encode the photo of face {doc['_id']}, skipping it")
+                doc["encoding"] = None if encoding is None else [float(v) for v in encoding]
+                doc["encoding_file_id"] = doc["file_id"]
+                updates.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"encoding": doc["encoding"], "encoding_file_id": doc["file_id"]}},
+                ))
+            self.collection.bulk_write(updates, ordered=False)
+            logger.info(f"Encoded {len(stale)} face image(s) from GridFS")
+        return {doc["_id"]: (doc["name"], doc["encoding"]) for doc in docs if doc.get("encoding") is not None}
+
+    def refresh(self, full=False):
+        """Loads new (or with full=True, all) documents; returns True when the gallery changed."""
+        query = {} if full or self.last_id is None else {"_id": {"$gt": self.last_id}}
+        docs = list(self.collection.find(query).sort("_id", 1))
+        entries = self._encode(docs)
+
+        with self._lock:
+            before = self.entries
+            self.entries = entries if full else {**self.entries, **entries}
+            if docs:
+                self.last_id = docs[-1]["_id"]
+            return self.entries != before
+
+    def watch(self, on_change, stop_event=None):
+        """Applies change-stream events as they arrive and calls on_change() after each one."""
+        with self.collection.watch(full_document="updateLookup") as stream:
+            while stop_event is None or not stop_event.is_set():
+                change = stream.try_next()
+                if change is None:
+                    continue
+                doc_id = change["documentKey"]["_id"]
+                doc = change.get("fullDocument")
+                with self._lock:
+                    self.entries.pop(doc_id, None)
+                if doc is not None and change["operationType"] in ("insert", "update", "replace"):
+                    entries = self._encode([doc])
+                    with self._lock:
+                        self.entries.update(entries)
+                on_change()
+
+    def gallery(self):
+        """Returns (names, encodings) for every document with a face."""
+        with self._lock:
+            items = list(self.entries.values())
+        names = [name for name, _ in items]
+        encodings = np.array([encoding for _, encoding in items], dtype=np.float32).reshape(-1, ENCODING_DIM)
+        return names, encodings
 
-def fetch_known_faces():
-    known_faces = []
-    known_names = []
-
-    for file in db[COLLECTION_NAME].find():
-        name = file["name"]
-        image_data = fs.get(file["file_id"]).read()
-
-        # Save to a temp file to use with face_recognition
-        temp_file = f"temp/{file['_id']}.jpg"
-        os.makedirs("temp", exist_ok=True)
-        with open(temp_file, "wb") as f:
-            f.write(image_data)
-
-        # Load the face encoding
-        import face_recognition
-        image = face_recognition.load_image_file(temp_file)
-        encodings = face_recognition.face_encodings(image)
-        
-        if encodings:
-            known_faces.append(encodings[0])
-            known_names.append(name)
-
-    return known_names, known_faces
+def fetch_known_faces(executor=None):
+    sync = FaceSync(executor=executor)
+    sync.refresh(full=True)
+    known_names, known_faces = sync.gallery()
+    return known_names, list(known_faces)
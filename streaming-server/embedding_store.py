@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from gallery import ENCODING_DIM
+
+logger = logging.getLogger("embedding_store")
+
+INDEX_VERSION = 1
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def label_from_filename(filename):
+    # faces/mark_1.jpg -> "mark"
+    return os.path.splitext(filename)[0].split("_")[0]
+
+
+class EmbeddingStore:
+    """
+    On-disk cache of face encodings for an image folder.
+
+    Encodings live in a .npy matrix (rows grouped by name) described by a JSON
+    index keyed on file path with mtime, size and sha1. Only new or changed
+    images are re-encoded. The matrix is opened with mmap_mode="r" so every
+    worker process shares the same read-only pages.
+
+    The index is the commit point: a new generation of the matrix is written
+    under a fresh file name first and the index is swapped in with os.replace,
+    so readers never see a half-written cache.
+    """
+
+    def __init__(self, cache_dir, name="embeddings"):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, f"{name}.json")
+        self.name = name
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != INDEX_VERSION:
+            return None
+        return index
+
+    def load(self):
+        """Returns (names, matrix) from the cache without touching the images, or None."""
+        index = self._read_index()
+        if index is None:
+            return None
+        try:
+            matrix = np.load(os.path.join(self.cache_dir, index["matrix"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        names = [entry["name"] for entry in index["entries"] if entry["row"] is not None]
+        if matrix.shape != (len(names), ENCODING_DIM):
+            return None
+        return names, matrix
+
+    def sync(self, folder, encode, label=label_from_filename, executor=None):
+        """
+        Brings the cache in line with folder and returns (names, matrix).
+
+        encode(path) must return one encoding or None when no face is found;
+        images without a face, or that encode(path) fails on, are remembered
+        too so they aren't retried. New
+        images are encoded in parallel on the given executor (serially without
+        one). A missing or empty folder gives an empty gallery, never None.
+        """
+        index = self._read_index()
+        old_entries = {e["path"]: e for e in index["entries"]} if index else {}
+        old_matrix = None
+        if index:
+            try:
+                old_matrix = np.load(os.path.join(self.cache_dir, index["matrix"]), mmap_mode="r")
+            except (OSError, ValueError):
+                old_entries = {}
+
+        entries = []
+        vectors = {}
+        todo = []
+        changed = False
+        filenames = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+        for filename in filenames:
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(folder, filename)
+            stat = os.stat(path)
+            entry = {"path": filename, "name": label(filename), "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+            old = old_entries.get(filename)
+            if old and (old["mtime"], old["size"]) == (entry["mtime"], entry["size"]):
+                entry["sha1"] = old["sha1"]
+            else:
+                entry["sha1"] = file_digest(path)
+                changed = True
+
+            entry["row"] = None
+            entries.append(entry)
+            if old and old["sha1"] == entry["sha1"]:
+                if old["row"] is not None:
+                    vectors[filename] = np.asarray(old_matrix[old["row"]], dtype=np.float32)
+            else:
+                todo.append(filename)
+
+        if todo:
+            logger.info(f"Encoding {len(todo)} image(s) from {folder}")
+            paths = [os.path.join(folder, name) for name in todo]
+            results = [executor.submit(encode, path) for path in paths] if executor else paths
+            for filename, result in zip(todo, results):
+                try:
+                    vector = result.result() if executor else encode(result)
+                except BrokenProcessPool:
+                    raise  # The workers died, not the image; try it again with the next sync
+                except Exception:
+                    logger.exception(f"Can't encode {filename}, keeping it out of the gallery")
+                    vector = None
+                if vector is not None:
+                    vectors[filename] = np.asarray(vector, dtype=np.float32)
+            changed = True
+
+        if len(entries) != len(old_entries):
+            changed = True
+        if not changed:
+            cached = self.load()
+            if cached is not None:
+                return cached
+
+        # Group rows by name so FaceGallery can use the matrix without reordering it
+        entries.sort(key=lambda e: (e["name"], e["path"]))
+        matrix = np.zeros((len(vectors), ENCODING_DIM), dtype=np.float32)
+        row = 0
+        for entry in entries:
+            if entry["path"] in vectors:
+                matrix[row] = vectors[entry["path"]]
+                entry["row"] = row
+                row += 1
+
+        self._write(matrix, entries, index)
+        names = [entry["name"] for entry in entries if entry["row"] is not None]
+        return self.load() or (names, matrix)
+
+    def _write(self, matrix, entries, old_index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest = hashlib.sha1(matrix.tobytes()).hexdigest()[:12]
+        matrix_name = f"{self.name}-{digest}.npy"
+        matrix_path = os.path.join(self.cache_dir, matrix_name)
+        if not os.path.exists(matrix_path):
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp, matrix_path)
+
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": INDEX_VERSION, "matrix": matrix_name, "entries": entries}, f)
+        os.replace(tmp, self.index_path)
+
+        if old_index and old_index["matrix"] != matrix_name:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_index["matrix"]))
+            except OSError:
+                # Still mapped by another worker on Windows; leaving it behind is harmless
+                pass
@@ -0,0 +1,157 @@
+from collections import Counter, deque
+from itertools import count
+
+import cv2
+import numpy as np
+
+from metrics import stage_timer
+
+
+def iou_matrix(a, b):
+    """Pairwise intersection-over-union of (x, y, w, h) boxes, shape (len(a), len(b))."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    iw = np.clip(np.minimum(ax2[:, None], bx2[None]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(ay2[:, None], by2[None]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    def __init__(self, track_id, box, vote_window=5):
+        self.id = track_id
+        self.box = box
+        self.misses = 0
+        self.certainty = 0.0  # 1.0 right after a prediction, decays with time and motion
+        self.reacquired = False
+        self.votes = deque(maxlen=vote_window)  # (name, confidence) of recent predictions
+
+    @property
+    def name(self):
+        # Majority over recent predictions keeps the label from flickering
+        return Counter(name for name, _ in self.votes).most_common(1)[0][0] if self.votes else "Unknown"
+
+    @property
+    def confidence(self):
+        """Mean confidence of the predictions that voted for the current name."""
+        name = self.name
+        confidences = [confidence for voted, confidence in self.votes if voted == name]
+        return sum(confidences) / len(confidences) if confidences else 0
+
+
+class FaceTracker:
+    """
+    Detect-and-track layer in front of the LBPH recognizer.
+
+    Every update runs Haar detection on a downscaled grayscale copy of the frame
+    and associates the boxes with existing tracks by IoU. predict(roi_gray) is
+    only called for new tracks, for tracks reacquired after being lost, and once
+    a track's certainty in its last prediction has decayed below min_certainty.
+    Certainty is multiplied each update by decay (unknown_decay while the track
+    is still unknown) and by the IoU between the old and new box, so a still face
+    is re-checked rarely and a moving one soon. The ROI is cut from the
+    full-resolution frame, so recognition quality is unchanged.
+
+    predict_batch(rois), when given, receives all ROIs of an update at once and
+    may return None for ones it skipped; those tracks retry on the next update.
+    """
+
+    def __init__(self, face_cascade, predict=None, downscale=0.5, iou_threshold=0.3, max_misses=2,
+                 decay=0.95, unknown_decay=0.7, min_certainty=0.6, vote_window=5, min_size=(50, 50),
+                 predict_batch=None, name=""):
+        self.face_cascade = face_cascade
+        self.predict_batch = predict_batch or (lambda rois: [predict(roi) for roi in rois])
+        self.downscale = downscale
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.decay = decay
+        self.unknown_decay = unknown_decay
+        self.min_certainty = min_certainty
+        self.vote_window = vote_window
+        self.min_size = (max(1, int(min_size[0] * downscale)), max(1, int(min_size[1] * downscale)))
+        self.tracks = []
+        self._ids = count(1)
+        self._cvt_timer = stage_timer("cvtColor", name)
+        self._detect_timer = stage_timer("detect", name)
+        self._predict_timer = stage_timer("predict", name)
+
+    def detect(self, frame):
+        with self._cvt_timer.time():
+            small = cv2.resize(frame, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        with self._detect_timer.time():
+            boxes = self.face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=self.min_size)
+        return [tuple(int(v / self.downscale) for v in box) for box in boxes]
+
+    def _associate(self, boxes):
+        matches, unmatched = {}, set(range(len(boxes)))
+        if not self.tracks or not boxes:
+            return matches, unmatched
+        ious = iou_matrix([t.box for t in self.tracks], boxes)
+        # Greedy assignment, best overlap first
+        for flat in np.argsort(ious, axis=None)[::-1]:
+            t, b = (int(i) for i in np.unravel_index(flat, ious.shape))
+            if ious[t, b] < self.iou_threshold:
+                break
+            if t in matches or b not in unmatched:
+                continue
+            matches[t] = b
+            unmatched.discard(b)
+        return matches, unmatched
+
+    def _needs_prediction(self, track):
+        return not track.votes or track.reacquired or track.certainty < self.min_certainty
+
+    def _predict(self, frame, tracks):
+        pending, rois = [], []
+        for track in tracks:
+            x, y, w, h = track.box
+            roi = frame[max(0, y):y + h, max(0, x):x + w]
+            if roi.size:
+                pending.append(track)
+                rois.append(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY))
+        if not rois:
+            return
+
+        with self._predict_timer.time():
+            results = self.predict_batch(rois)
+        for track, result in zip(pending, results):
+            if result is None:
+                continue
+            track.votes.append(result)
+            track.certainty = 1.0
+            track.reacquired = False
+
+    def update(self, frame):
+        """Returns [(x, y, w, h, name, confidence)] for the current tracks."""
+        boxes = self.detect(frame)
+        matches, unmatched = self._associate(boxes)
+
+        tracks = []
+        for i, track in enumerate(self.tracks):
+            if i in matches:
+                box = boxes[matches[i]]
+                decay = self.unknown_decay if track.name == "Unknown" else self.decay
+                track.certainty *= decay * float(iou_matrix([track.box], [box])[0, 0])
+                track.reacquired = track.reacquired or track.misses > 0
+                track.box = box
+                track.misses = 0
+            else:
+                track.misses += 1
+            if track.misses <= self.max_misses:
+                tracks.append(track)
+        for b in sorted(unmatched):
+            tracks.append(Track(next(self._ids), boxes[b], self.vote_window))
+        self.tracks = tracks
+
+        visible = [track for track in self.tracks if not track.misses]
+        self._predict(frame, [track for track in visible if self._needs_prediction(track)])
+
+        results = []
+        for track in visible:
+            x, y, w, h = track.box
+            results.append((x, y, w, h, track.name, track.confidence))
+        return results
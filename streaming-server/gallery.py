@@ -0,0 +1,81 @@
+import numpy as np
+
+ENCODING_DIM = 128
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_TOP_K = 3
+
+
+class FaceGallery:
+    """
+    Known face encodings stored as one contiguous float32 matrix.
+
+    Rows are grouped by person so a whole batch of probes can be matched with a
+    single distance computation followed by a per-person min-reduction (best of
+    several enrolled shots).
+    """
+
+    def __init__(self, names=(), encodings=()):
+        names = np.asarray(list(names), dtype=object)
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(names) != len(encodings):
+            raise ValueError("names and encodings must have the same length")
+
+        self.labels, label_index = np.unique(names.astype(str), return_inverse=True)
+        if np.any(np.diff(label_index) < 0):
+            order = np.argsort(label_index, kind="stable")
+            label_index = label_index[order]
+            encodings = encodings[order]
+        # Already grouped input (e.g. a memory-mapped cache) is used without a copy
+        self.label_index = label_index
+        self.names = self.labels[self.label_index]
+        self.matrix = np.ascontiguousarray(encodings)
+        self._sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        # Start offset of every person's block of rows, for np.minimum.reduceat
+        self._group_starts = np.flatnonzero(np.diff(self.label_index, prepend=-1))
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def people(self):
+        return len(self.labels)
+
+    def distances(self, probes):
+        """Euclidean distance from every probe to every gallery row, shape (P, N)."""
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        sq = self._sq_norms[None, :] + np.einsum("ij,ij->i", probes, probes)[:, None] - 2.0 * (probes @ self.matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def person_distances(self, probes):
+        """Best (smallest) distance from every probe to every person, shape (P, people)."""
+        return np.minimum.reduceat(self.distances(probes), self._group_starts, axis=1)
+
+    def match(self, probes, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K):
+        """
+        Returns one entry per probe: {"name", "distance", "candidates"} where name is
+        the closest person under threshold (or "Unknown") and candidates is the
+        top_k nearest people with their distances.
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if not len(self) or not len(probes):
+            return [{"name": "Unknown", "distance": None, "candidates": []} for _ in range(len(probes))]
+
+        per_person = self.person_distances(probes)
+        k = max(1, min(top_k, self.people))
+        nearest = np.argpartition(per_person, k - 1, axis=1)[:, :k]
+        nearest_d = np.take_along_axis(per_person, nearest, axis=1)
+        order = np.argsort(nearest_d, axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_d = np.take_along_axis(nearest_d, order, axis=1)
+
+        results = []
+        for idx, dist in zip(nearest, nearest_d):
+            candidates = [{"name": str(self.labels[i]), "distance": float(d)} for i, d in zip(idx, dist)]
+            best = candidates[0]
+            results.append({
+                "name": best["name"] if best["distance"] < threshold else "Unknown",
+                "distance": best["distance"],
+                "candidates": candidates,
+            })
+        return results
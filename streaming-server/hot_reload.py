@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("hot_reload")
+
+
+def path_signature(path):
+    """Cheap fingerprint of a file, or of a directory's direct entries."""
+    try:
+        if os.path.isdir(path):
+            return tuple(sorted(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in os.scandir(path)
+            ))
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class Reloader:
+    """
+    Rebuilds a model in the background and swaps it in atomically.
+
+    load() builds the new model without touching the live one and apply(model)
+    installs it (a single reference assignment), so requests and frames in
+    flight finish on the version they started with. Reloads never overlap;
+    one requested while another is running is folded into a follow-up run.
+    """
+
+    def __init__(self, load, apply, name="model"):
+        self.load = load
+        self.apply = apply
+        self.name = name
+        self.version = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+
+    @property
+    def reloading(self):
+        return self._lock.locked()
+
+    def reload(self):
+        """Runs a reload in the calling thread; returns True if a new model was installed."""
+        self._pending.set()
+        if not self._lock.acquire(blocking=False):
+            return False
+        installed = False
+        try:
+            while self._pending.is_set():
+                self._pending.clear()
+                try:
+                    self.apply(self.load())
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.exception(f"Reloading {self.name} failed, keeping version {self.version}")
+                    continue
+                self.version += 1
+                self.last_error = None
+                installed = True
+                logger.info(f"Reloaded {self.name}, now at version {self.version}")
+        finally:
+            self._lock.release()
+        # A request that arrived just as the loop above finished
+        if self._pending.is_set():
+            return self.reload() or installed
+        return installed
+
+    def reload_in_background(self):
+        threading.Thread(target=self.reload, daemon=True, name=f"reload-{self.name}").start()
+
+    def watch(self, paths, interval=5.0):
+        """Starts a thread that reloads once the given files/directories change and settle."""
+        thread = threading.Thread(target=self._watch, args=(paths, interval), daemon=True, name=f"watch-{self.name}")
+        thread.start()
+        return thread
+
+    def _watch(self, paths, interval):
+        current = [path_signature(path) for path in paths]
+        while True:
+            time.sleep(interval)
+            latest = [path_signature(path) for path in paths]
+            if latest == current:
+                continue
+            # Wait until writers are done (e.g. trainer.yml and labels.json both replaced)
+            while True:
+                time.sleep(interval)
+                settled = [path_signature(path) for path in paths]
+                if settled == latest:
+                    break
+                latest = settled
+            current = latest
+            logger.info(f"Change detected in {paths}, reloading {self.name}")
+            self.reload()
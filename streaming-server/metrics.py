@@ -0,0 +1,260 @@
+"""
+Minimal Prometheus-style metrics for the streaming-server services.
+
+Counters, gauges and histograms are cheap enough for per-frame use (a dict
+lookup is avoided by keeping the labelled child around, and an observation is
+a bisect plus a few additions under a lock). Values that already live on
+service objects are exported through collectors evaluated at scrape time, so
+they cost nothing on the hot path. render() produces the text exposition
+format served at /metrics.
+"""
+import bisect
+import collections
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger("metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond color conversions up to slow network reads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def stream_label(source):
+    """Label for a camera source with any credentials removed from its URL."""
+    source = str(source)
+    parts = urlsplit(source)
+    if parts.scheme and "@" in parts.netloc:
+        parts = parts._replace(netloc=parts.netloc.rsplit("@", 1)[1])
+        return urlunsplit(parts)
+    return source
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """
+        Registers fn() -> iterable of (name, type, help, [(labels, value), ...]),
+        evaluated on every scrape. Usable as a decorator.
+        """
+        with self._lock:
+            self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics):
+            lines.extend(metric.render())
+        for fn in list(self.collectors):
+            try:
+                families = list(fn())
+            except Exception:
+                logger.exception(f"Metrics collector {getattr(fn, '__name__', fn)} failed, skipping it")
+                continue
+            for name, kind, doc, samples in families:
+                lines.append(f"# HELP {name} {doc}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, doc, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Metrics without labels act as their own single child
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(child.render(self.name, dict(zip(self.labelnames, key))))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, doc, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+# Shared per-stage timing for every frame loop and request path
+STAGE_SECONDS = Histogram(
+    "eduvision_stage_seconds",
+    "Time spent in each processing stage (read, cvtColor, detect, predict, encode, imencode, ...).",
+    ["stage", "stream"],
+)
+
+
+def stage_timer(stage, stream=""):
+    return STAGE_SECONDS.labels(stage=stage, stream=stream)
+
+
+def profile_threads(seconds=5.0, interval=0.005, name_prefix=None):
+    """
+    Sampling profiler for the frame loops: snapshots the stacks of live threads
+    (optionally only those whose name starts with name_prefix) every interval
+    for the given duration and returns them in collapsed-stack format
+    ("thread;outer;...;inner count" per line), ready for flamegraph tools.
+    Nothing is sampled unless this is called.
+    """
+    names = {}
+    stacks = collections.Counter()
+    deadline = time.monotonic() + seconds
+    me = threading.get_ident()
+    while time.monotonic() < deadline:
+        for thread in threading.enumerate():
+            names[thread.ident] = thread.name
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, str(ident))
+            if ident == me or (name_prefix and not name.startswith(name_prefix)):
+                continue
+            calls = [f"{entry.name}@{os.path.basename(entry.filename)}:{entry.lineno}" for entry in traceback.extract_stack(frame)]
+            stacks[";".join([re.sub(r"[;\s]+", "_", name)] + calls)] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
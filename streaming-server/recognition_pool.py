@@ -0,0 +1,108 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from metrics import stage_timer
+
+logger = logging.getLogger("recognition_pool")
+
+
+class RecognitionPool:
+    """
+    Worker threads that run predict(roi) for every camera on one set of models.
+
+    ROIs from all streams go through one bounded queue; each worker takes up to
+    max_batch of them per wake-up, but still calls predict once per ROI, since
+    the LBPH recognizer has no batched predict. When the queue is full new ROIs
+    are rejected rather than queued, so a node that falls behind sheds
+    recognition work (tracks keep their last label and retry on the next
+    detection) instead of building up latency.
+    """
+
+    def __init__(self, predict, workers=2, max_batch=16, max_pending=64):
+        self.predict = predict
+        self.workers = workers
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._compute_timer = stage_timer("predict_compute", "pool")
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stop_event.clear()
+            self._threads = [
+                threading.Thread(target=self._worker, daemon=True, name=f"recognition-{i}")
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        # Nothing will run what is still queued; cancel it so no caller waits on it
+        while True:
+            try:
+                _, future = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
+
+    def submit(self, roi):
+        """Returns a Future for predict(roi), or None when the pool is saturated."""
+        self.start()
+        future = Future()
+        try:
+            self.queue.put_nowait((roi, future))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return future
+
+    def predict_batch(self, rois, timeout=1.0):
+        """Submits every ROI at once and returns their results; skipped or failed ones are None."""
+        futures = [self.submit(roi) for roi in rois]
+        # One deadline for the whole batch, not timeout per ROI
+        deadline = time.monotonic() + timeout
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(max(0.0, deadline - time.monotonic())) if future else None)
+            except TimeoutError:
+                future.cancel()
+                results.append(None)
+            except Exception:
+                logger.exception("Recognition failed")
+                results.append(None)
+        return results
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for roi, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with self._compute_timer.time():
+                        result = self.predict(roi)
+                    future.set_result(result)
+                except Exception as e:
+                    future.set_exception(e)
@@ -0,0 +1,30 @@
+import io
+
+# Set per child process by init_worker so dlib's models are loaded once per worker
+face_recognition = None
+
+
+def init_worker():
+    global face_recognition
+    import face_recognition as fr
+    face_recognition = fr
+
+
+def encode_image_bytes(data):
+    """Decodes an uploaded image and returns the encodings of every face in it."""
+    if face_recognition is None:
+        init_worker()
+    image = face_recognition.load_image_file(io.BytesIO(data))
+    return face_recognition.face_encodings(image)
+
+
+def encode_first_face(data):
+    """Encoding of the first face in an enrollment photo, or None."""
+    encodings = encode_image_bytes(data)
+    return encodings[0] if encodings else None
+
+
+def encode_first_file(path):
+    """encode_first_face for a gallery photo on disk."""
+    with open(path, "rb") as f:
+        return encode_first_face(f.read())
@@ -0,0 +1,118 @@
+"""
+WebRTC video track fed by a shared RTSPRelay.
+
+Kept apart from rtsp_to_webrtc.py so the signaling server starts without
+importing aiortc and PyAV, which only the peers that send video need.
+"""
+import asyncio
+import logging
+import time
+
+import cv2
+import numpy as np
+from aiortc import VideoStreamTrack
+from aiortc.mediastreams import MediaStreamError, VIDEO_CLOCK_RATE, VIDEO_TIME_BASE
+from av import VideoFrame
+
+from rtsp_to_webrtc import OUTPUT_FPS, OUTPUT_QUALITY, RTSP_URL, RTSPRelay
+from video_pipeline import OUTPUT_PROFILES, QualityController, profile_index
+
+logger = logging.getLogger("webrtc")
+
+# Black yuv420p frame shown until the camera delivers its first frame
+BLACK_FRAME = cv2.cvtColor(np.zeros((480, 640, 3), dtype=np.uint8), cv2.COLOR_BGR2YUV_I420)
+
+# RTSP Video Stream
+class RTSPVideoTrack(VideoStreamTrack):
+    """
+    A video track that returns frames from an RTSP stream
+
+    Frames come from the camera's shared RTSPRelay, so recv never blocks the
+    event loop and N viewers of a room cost one RTSP session and one decode.
+    It always returns the newest frame available and repeats the last one
+    (or a black frame) while the camera is down.
+
+    Each track sends at its own output profile (size and frame rate, see
+    video_pipeline.OUTPUT_PROFILES), optionally capped by fps. Unless adaptive
+    is off, a track whose peer takes longer than a frame interval to encode and
+    send each frame steps down to a lower profile, and back up once it keeps up.
+    """
+    kind = "video"  # Explicitly set the track kind
+    
+    def __init__(self, url=RTSP_URL, quality=OUTPUT_QUALITY, fps=OUTPUT_FPS or None, width=None, adaptive=True):
+        super().__init__()  # Initialize the parent class
+        self.relay = RTSPRelay.subscribe(url)
+        self.fps = fps
+        start = profile_index(OUTPUT_PROFILES, None if width else quality, width)
+        self.controller = QualityController(OUTPUT_PROFILES, start, adaptive)
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self.repeated_frames = 0
+        self.last_seq = 0
+        self.last_width = None
+        self.last_frame = BLACK_FRAME
+        self._returned_at = None
+    
+    @property
+    def stats(self):
+        return {
+            **(self.relay.stats if self.relay else {}),
+            "profile": self.controller.profile.name,
+            "sent": self.frame_count,
+            "dropped": self.dropped_frames,
+            "repeated": self.repeated_frames,
+        }
+
+    async def next_timestamp(self):
+        # aiortc's pacing, at this track's current frame interval instead of a fixed 30 fps
+        if self.readyState != "live":
+            raise MediaStreamError
+
+        if hasattr(self, "_timestamp"):
+            self._timestamp += int(self.controller.interval(self.fps) * VIDEO_CLOCK_RATE)
+            wait = self._start + (self._timestamp / VIDEO_CLOCK_RATE) - time.time()
+            await asyncio.sleep(wait)
+        else:
+            self._start = time.time()
+            self._timestamp = 0
+        return self._timestamp, VIDEO_TIME_BASE
+
+    async def recv(self):
+        # Time the peer spent encoding and sending the previous frame since we handed it over
+        if self._returned_at is not None:
+            self.controller.record(time.perf_counter() - self._returned_at, self.controller.interval(self.fps))
+
+        # Get frame timestamp
+        pts, time_base = await self.next_timestamp()
+        
+        # Take whatever the relay has most recently decoded, converted for this track's profile
+        width = self.controller.profile.width
+        seq = self.relay.frames.seq if self.relay else 0
+        if seq > self.last_seq or (seq and width != self.last_width):
+            seq, frame = await asyncio.to_thread(self.relay.frame, width)
+            if self.last_seq:
+                self.dropped_frames += max(0, seq - self.last_seq - 1)
+                self.relay.dropped_frames += max(0, seq - self.last_seq - 1)
+            self.last_seq = seq
+            self.last_width = width
+            self.last_frame = frame
+        else:
+            self.repeated_frames += 1
+        
+        video_frame = VideoFrame.from_ndarray(self.last_frame, format="yuv420p")
+        video_frame.pts = pts
+        video_frame.time_base = time_base
+        
+        # Log occasionally
+        self.frame_count += 1
+        if self.frame_count % 100 == 0:
+            logger.info(f"Processed {self.frame_count} frames: {self.stats}")
+
+        self._returned_at = time.perf_counter()
+        return video_frame
+
+    def stop(self):
+        super().stop()
+        if self.relay:
+            self.relay.unsubscribe()
+            self.relay = None
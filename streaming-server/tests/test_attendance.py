@@ -0,0 +1,124 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip("mongomock")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance import AttendanceWriter, PresenceEvent, PresenceTracker  # noqa: E402
+
+MONDAY = datetime(2024, 1, 1)
+
+
+def at(hhmm):
+    hours, minutes = map(int, hhmm.split(":"))
+    return MONDAY.replace(hour=hours, minute=minutes).timestamp()
+
+
+@pytest.fixture
+def database():
+    return mongomock.MongoClient().eduvision
+
+
+def enroll(database, room="room1", start="08:00", end="10:00"):
+    instructor = ObjectId()
+    database["users"].insert_one({"_id": instructor, "college": ObjectId(), "course": "BSIT"})
+    schedule = database["schedules"].insert_one({
+        "instructor": instructor, "room": room, "startTime": start, "endTime": end,
+        "semesterStartDate": "2023-08-01", "semesterEndDate": "2024-05-31", "days": {"mon": True},
+    }).inserted_id
+    return str(instructor), schedule
+
+
+def test_misidentified_frame_makes_no_event():
+    tracker = PresenceTracker(min_frames=3, max_gap=2.0)
+    assert tracker.observe("room1", ["mark"], now=0.0) == []
+    assert tracker.observe("room1", ["sean"], now=5.0) == []  # mark's single frame has lapsed
+    assert tracker.observe("room1", ["sean"], now=5.5) == []
+    events = tracker.observe("room1", ["sean"], now=6.0)
+    assert events == [PresenceEvent("in", "sean", "room1", 5.0)]
+    assert tracker.observe("room1", ["sean"], now=6.5) == []
+
+
+def test_person_leaves_after_absent_after():
+    tracker = PresenceTracker(min_frames=1, absent_after=60.0)
+    tracker.observe("room1", ["mark"], now=0.0)
+    tracker.observe("room1", ["mark"], now=10.0)
+    assert tracker.expire(now=30.0) == []
+    assert tracker.expire(now=71.0) == [PresenceEvent("out", "mark", "room1", 10.0)]
+
+
+def test_present_and_late_status_and_earliest_time_in(database):
+    early, early_schedule = enroll(database)
+    late, late_schedule = enroll(database)
+    writer = AttendanceWriter(database, database["recognition_events"], late_after=15)
+
+    writer.add([PresenceEvent("in", early, "room1", at("08:05")), PresenceEvent("in", late, "room1", at("08:20"))])
+    assert writer.flush() == 2
+    writer.add([PresenceEvent("in", early, "room1", at("07:55"))])
+    writer.flush()
+
+    early_log = database["logs"].find_one({"schedule": early_schedule})
+    assert (early_log["status"], early_log["timeIn"], early_log["date"]) == ("present", "07:55", "2024-01-01")
+    late_log = database["logs"].find_one({"schedule": late_schedule})
+    assert (late_log["status"], late_log["timeIn"]) == ("late", "08:20")
+    assert late_log["course"] == "BSIT"
+
+
+def test_out_only_updates_an_existing_log(database):
+    instructor, schedule = enroll(database)
+    writer = AttendanceWriter(database)
+
+    writer.add([PresenceEvent("out", instructor, "room1", at("09:00"))])
+    writer.flush()
+    assert database["logs"].count_documents({}) == 0
+
+    writer.add([
+        PresenceEvent("in", instructor, "room1", at("08:00")),
+        PresenceEvent("out", instructor, "room1", at("09:50")),
+        PresenceEvent("out", instructor, "room1", at("09:30")),
+    ])
+    writer.flush()
+    log = database["logs"].find_one({"schedule": schedule})
+    assert (log["timeIn"], log["timeout"]) == ("08:00", "09:50")
+
+
+def test_unscheduled_events_are_only_kept_as_events(database):
+    instructor, _ = enroll(database)
+    writer = AttendanceWriter(database, database["recognition_events"])
+    writer.add([PresenceEvent("in", instructor, "room2", at("08:00")), PresenceEvent("in", "Unknown", "room1", 0.0)])
+    assert writer.flush() == 0
+    assert writer.unmatched == 2
+    assert database["recognition_events"].count_documents({}) == 2
+    assert database["logs"].count_documents({}) == 0
+
+
+def test_retried_flush_writes_no_duplicate_events(database, monkeypatch):
+    instructor, schedule = enroll(database)
+    writer = AttendanceWriter(database, database["recognition_events"])
+    schedules = writer._schedules
+    failures = iter([ConnectionError("primary stepped down")])
+
+    def flaky_schedules(events):
+        for error in failures:
+            raise error
+        return schedules(events)
+
+    monkeypatch.setattr(writer, "_schedules", flaky_schedules)
+    writer.add([
+        PresenceEvent("in", instructor, "room1", at("08:00")),
+        PresenceEvent("out", instructor, "room1", at("09:00")),
+    ])
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    assert database["recognition_events"].count_documents({}) == 2
+    assert len(writer.pending) == 2
+
+    assert writer.flush() == 2
+    assert database["recognition_events"].count_documents({}) == 2
+    assert database["logs"].count_documents({"schedule": schedule, "timeout": "09:00"}) == 1
+    assert writer.unmatched == 0
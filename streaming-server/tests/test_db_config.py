@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip("mongomock")
+import mongomock.gridfs  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+mongomock.gridfs.enable_gridfs_integration()
+
+import gridfs  # noqa: E402
+
+import db_config  # noqa: E402
+from db_config import COLLECTION_NAME, FaceSync  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    encoded = []
+
+    def encode_first_face(blob):
+        # "face:<v>" stands for a photo whose encoding is all v; anything else fails to decode
+        encoded.append(blob)
+        if not blob.startswith(b"face:"):
+            raise ValueError("cannot identify image file")
+        return np.full(128, float(blob[5:]))
+
+    monkeypatch.setattr(db_config, "encode_first_face", encode_first_face)
+    database = mongomock.MongoClient().db
+    database.encoded = encoded
+    return database
+
+
+def enroll(database, name, blob):
+    file_id = gridfs.GridFS(database).put(blob)
+    return database[COLLECTION_NAME].insert_one({"name": name, "file_id": file_id}).inserted_id
+
+
+def test_incremental_refresh_only_encodes_new_documents(database):
+    enroll(database, "mark", b"face:1")
+    sync = FaceSync(database)
+    assert sync.refresh(full=True)
+
+    enroll(database, "sean", b"face:2")
+    assert sync.refresh()
+    names, encodings = sync.gallery()
+    assert names == ["mark", "sean"]
+    assert encodings.shape == (2, 128)
+    assert database.encoded == [b"face:1", b"face:2"]
+
+    assert not sync.refresh()
+    # A restarted service reuses the encodings saved on the documents
+    assert FaceSync(database).refresh(full=True)
+    assert len(database.encoded) == 2
+
+
+def test_full_refresh_picks_up_replacements_and_deletions(database):
+    mark = enroll(database, "mark", b"face:1")
+    sean = enroll(database, "sean", b"face:2")
+    sync = FaceSync(database)
+    sync.refresh(full=True)
+
+    new_file = gridfs.GridFS(database).put(b"face:3")
+    database[COLLECTION_NAME].update_one({"_id": mark}, {"$set": {"file_id": new_file}})
+    database[COLLECTION_NAME].delete_one({"_id": sean})
+    assert not sync.refresh()  # Only new _ids are seen incrementally
+
+    assert sync.refresh(full=True)
+    names, encodings = sync.gallery()
+    assert names == ["mark"]
+    assert encodings[0][0] == 3.0
+
+
+def test_bad_documents_are_skipped_and_not_retried(database):
+    database[COLLECTION_NAME].insert_one({"name": "dangling", "file_id": ObjectId()})
+    enroll(database, "corrupt", b"not an image")
+    enroll(database, "mark", b"face:1")
+
+    sync = FaceSync(database)
+    assert sync.refresh(full=True)
+    assert sync.gallery()[0] == ["mark"]
+    for doc in database[COLLECTION_NAME].find({"name": {"$in": ["dangling", "corrupt"]}}):
+        assert doc["encoding"] is None
+        assert doc["encoding_file_id"] == doc["file_id"]
+
+    attempts = len(database.encoded)
+    sync.refresh(full=True)
+    assert len(database.encoded) == attempts
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_store import EmbeddingStore  # noqa: E402
+
+
+def test_unreadable_photo_is_remembered_not_fatal(tmp_path):
+    faces = tmp_path / "faces"
+    faces.mkdir()
+    (faces / "mark_1.jpg").write_bytes(b"face")
+    (faces / "broken_1.jpg").write_bytes(b"junk")
+    encoded = []
+
+    def encode(path):
+        encoded.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            if f.read() != b"face":
+                raise OSError("cannot identify image file")
+        return np.ones(128)
+
+    store = EmbeddingStore(str(tmp_path / "cache"))
+    names, matrix = store.sync(str(faces), encode)
+    assert names == ["mark"]
+    assert matrix.shape == (1, 128)
+
+    # Neither image is encoded again until it changes
+    assert store.sync(str(faces), encode)[0] == ["mark"]
+    assert sorted(encoded) == ["broken_1.jpg", "mark_1.jpg"]
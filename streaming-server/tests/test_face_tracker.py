@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_tracker import FaceTracker  # noqa: E402
+
+FRAME = np.zeros((120, 160, 3), dtype=np.uint8)
+
+
+class StubCascade:
+    """Returns whatever boxes the test sets, in downscaled-frame coordinates (downscale=1 here)."""
+
+    def __init__(self, boxes=()):
+        self.boxes = list(boxes)
+
+    def detectMultiScale(self, gray, **kwargs):
+        return list(self.boxes)
+
+
+class StubPredict:
+    """Answers each ROI from a script of (name, confidence) results, repeating the last one."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self, rois):
+        answers = []
+        for _ in rois:
+            answers.append(self.results[min(self.calls, len(self.results) - 1)])
+            self.calls += 1
+        return answers
+
+
+def tracker(cascade, predict, **kwargs):
+    return FaceTracker(cascade, predict_batch=predict, downscale=1.0, min_size=(1, 1), **kwargs)
+
+
+def run(face_tracker, updates):
+    return [face_tracker.update(FRAME) for _ in range(updates)]
+
+
+def test_still_face_is_repredicted_once_certainty_decays():
+    predict = StubPredict(("mark", 20.0))
+    face_tracker = tracker(StubCascade([(10, 10, 40, 40)]), predict, decay=0.95, min_certainty=0.6)
+    run(face_tracker, 1)
+    assert predict.calls == 1
+    # 0.95 ** 10 is the first power below 0.6
+    run(face_tracker, 9)
+    assert predict.calls == 1
+    run(face_tracker, 1)
+    assert predict.calls == 2
+
+
+def test_unknown_face_is_repredicted_sooner():
+    predict = StubPredict(("Unknown", 80.0))
+    face_tracker = tracker(StubCascade([(10, 10, 40, 40)]), predict, unknown_decay=0.7, min_certainty=0.6)
+    run(face_tracker, 7)
+    # Predicted on the first update, then every second one: 0.7 ** 2 < 0.6
+    assert predict.calls == 4
+
+
+def test_moving_face_is_repredicted_sooner_than_a_still_one():
+    cascade = StubCascade([(10, 10, 40, 40)])
+    predict = StubPredict(("mark", 20.0))
+    face_tracker = tracker(cascade, predict)
+    face_tracker.update(FRAME)
+    for step in range(1, 5):
+        cascade.boxes = [(10 + 8 * step, 10, 40, 40)]  # IoU 0.67 with the previous box
+        face_tracker.update(FRAME)
+    assert predict.calls >= 3
+
+
+def test_reacquired_track_is_repredicted():
+    cascade = StubCascade([(10, 10, 40, 40)])
+    predict = StubPredict(("mark", 20.0))
+    face_tracker = tracker(cascade, predict, max_misses=2)
+    face_tracker.update(FRAME)
+    cascade.boxes = []
+    assert face_tracker.update(FRAME) == []
+    cascade.boxes = [(10, 10, 40, 40)]
+    (x, y, w, h, name, _), = face_tracker.update(FRAME)
+    assert name == "mark"
+    assert predict.calls == 2
+    assert len({track.id for track in face_tracker.tracks}) == 1
+
+
+def test_majority_vote_and_its_confidence():
+    predict = StubPredict(("mark", 10.0), ("sean", 40.0), ("mark", 30.0))
+    # min_certainty above 1 forces a prediction on every update
+    face_tracker = tracker(StubCascade([(10, 10, 40, 40)]), predict, min_certainty=1.1, vote_window=5)
+    results = run(face_tracker, 3)
+    assert [result[0][4] for result in results] == ["mark", "mark", "mark"]
+    # The confidence shown is that of the voted name, not of the latest prediction
+    assert results[1][0][5] == pytest.approx(10.0)
+    assert results[2][0][5] == pytest.approx(20.0)
+
+
+def test_skipped_prediction_is_retried_next_update():
+    predict = StubPredict(None, ("mark", 20.0))
+    face_tracker = tracker(StubCascade([(10, 10, 40, 40)]), predict)
+    (first,), = run(face_tracker, 1)
+    assert first[4:] == ("Unknown", 0)
+    (second,), = run(face_tracker, 1)
+    assert second[4:] == ("mark", 20.0)
+    assert predict.calls == 2
+
+
+def test_each_face_keeps_its_own_track():
+    cascade = StubCascade([(0, 0, 40, 40), (100, 60, 40, 40)])
+    predict = StubPredict(("mark", 20.0), ("sean", 25.0))
+    face_tracker = tracker(cascade, predict)
+    run(face_tracker, 1)
+    cascade.boxes = [(102, 62, 40, 40), (2, 2, 40, 40)]
+    names = {(x // 50): name for x, y, w, h, name, _ in face_tracker.update(FRAME)}
+    assert names == {0: "mark", 2: "sean"}
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import ENCODING_DIM, FaceGallery  # noqa: E402
+
+
+def reference_match(names, encodings, probe, threshold, top_k):
+    """The per-pair loop FaceGallery.match replaced: every known face, best shot per person."""
+    best = {}
+    for name, encoding in zip(names, encodings):
+        distance = float(np.linalg.norm(np.asarray(encoding, dtype=np.float64) - probe))
+        best[name] = min(best.get(name, float("inf")), distance)
+    ranked = sorted(best.items(), key=lambda item: item[1])[:top_k]
+    return ranked[0][0] if ranked[0][1] < threshold else "Unknown", ranked
+
+
+@pytest.fixture
+def enrolled():
+    rng = np.random.default_rng(0)
+    people = [f"person{i}" for i in range(12)]
+    # Several shots per person, deliberately not grouped by name
+    names = [people[i % len(people)] for i in range(40)]
+    rng.shuffle(names)
+    centers = {name: rng.normal(0, 0.1, ENCODING_DIM) for name in people}
+    encodings = np.array([centers[name] + rng.normal(0, 0.03, ENCODING_DIM) for name in names])
+    probes = np.array([centers[name] + rng.normal(0, 0.03, ENCODING_DIM) for name in people[:6]]
+                      + [rng.normal(0, 0.1, ENCODING_DIM) for _ in range(4)])
+    return names, encodings, probes
+
+
+@pytest.mark.parametrize("threshold, top_k", [(0.6, 3), (0.45, 1), (0.3, 5), (10.0, 50)])
+def test_match_equals_per_pair_loop(enrolled, threshold, top_k):
+    names, encodings, probes = enrolled
+    results = FaceGallery(names, encodings).match(probes, threshold=threshold, top_k=top_k)
+    assert len(results) == len(probes)
+    for probe, result in zip(probes, results):
+        expected_name, ranked = reference_match(names, encodings, probe, threshold, top_k)
+        assert result["name"] == expected_name
+        assert [c["name"] for c in result["candidates"]] == [name for name, _ in ranked]
+        assert [c["distance"] for c in result["candidates"]] == pytest.approx([d for _, d in ranked], abs=1e-4)
+        assert result["distance"] == pytest.approx(ranked[0][1], abs=1e-4)
+
+
+def test_ungrouped_names_are_regrouped(enrolled):
+    names, encodings, _ = enrolled
+    gallery = FaceGallery(names, encodings)
+    assert gallery.people == len(set(names))
+    assert list(gallery.names) == sorted(names)
+    assert np.all(np.diff(gallery.label_index) >= 0)
+    # Each row still carries its own name's encoding
+    for name, row in zip(gallery.names, gallery.matrix):
+        assert any(n == name and np.allclose(e, row, atol=1e-6) for n, e in zip(names, encodings))
+
+
+def test_empty_gallery_and_no_probes():
+    gallery = FaceGallery([], np.empty((0, ENCODING_DIM)))
+    assert len(gallery) == 0
+    assert gallery.match(np.zeros((2, ENCODING_DIM))) == [{"name": "Unknown", "distance": None, "candidates": []}] * 2
+    assert FaceGallery(["mark"], np.zeros((1, ENCODING_DIM))).match(np.empty((0, ENCODING_DIM))) == []
+
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        FaceGallery(["mark", "sean"], np.zeros((1, ENCODING_DIM)))
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+# Generous enough for a slow CI machine; these imports take well under a second here. The detailed
+# import, first-response and time-to-ready numbers per service come from benchmarks/bench_startup.py
+IMPORT_BUDGET_SECONDS = 5.0
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "heavy": sorted(name for name in ("face_recognition", "dlib") if name in sys.modules),
+}}))
+"""
+
+
+@pytest.mark.parametrize("module", ["app", "face_recog"])
+def test_import_is_cheap(module):
+    result = subprocess.run([sys.executable, "-c", CHILD.format(module=module)], cwd=SERVER_DIR,
+                            capture_output=True, text=True, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    assert measured["heavy"] == []
+    assert measured["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # The workers only import face_recognition during warm-up; forked children inherit this stand-in
+    monkeypatch.setitem(sys.modules, "face_recognition", types.ModuleType("face_recognition"))
+    import app
+    from embedding_store import EmbeddingStore
+
+    monkeypatch.setattr(app, "RECOGNITION_WORKERS", 1)
+    monkeypatch.setattr(app, "FACES_WATCH_INTERVAL", 0)
+    monkeypatch.setattr(app, "MONGO_FACES", False)
+    monkeypatch.setattr(app, "WARMUP_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(app, "folder", str(tmp_path / "faces"))
+    monkeypatch.setattr(app, "store", EmbeddingStore(str(tmp_path / "cache")))
+    monkeypatch.setattr(app, "ready", False)
+    monkeypatch.setattr(app, "startup_error", None)
+    monkeypatch.setattr(app, "gallery", None)
+    monkeypatch.setattr(app.gallery_reloader, "version", 0)
+    return app
+
+
+def wait_for_ready(client, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get("/ready")
+        if response.status_code == 200:
+            return response
+        time.sleep(0.01)
+    return response
+
+
+def test_ready_after_gallery_loads(service, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    release = threading.Event()
+    load = service.gallery_reloader.load
+
+    def slow_load():
+        release.wait(10)
+        return load()
+
+    monkeypatch.setattr(service.gallery_reloader, "load", slow_load)
+    with TestClient(service.app) as client:
+        assert client.get("/health").status_code == 200
+        assert client.get("/ready").status_code == 503
+        release.set()
+        assert wait_for_ready(client).status_code == 200
+        assert client.get("/gallery").json()["version"] >= 1
+
+
+def test_warm_up_retries_failed_load(service, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    attempts = []
+    load = service.gallery_reloader.load
+
+    def flaky_load():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise OSError("faces/ is not mounted yet")
+        return load()
+
+    monkeypatch.setattr(service.gallery_reloader, "load", flaky_load)
+    with TestClient(service.app) as client:
+        assert wait_for_ready(client).status_code == 200
+    assert len(attempts) == 2
+
+
+@pytest.fixture
+def recognizer_service(tmp_path, monkeypatch):
+    import face_recog
+
+    monkeypatch.setattr(face_recog, "model_path", str(tmp_path / "trainer.yml"))
+    monkeypatch.setattr(face_recog, "data_dir", str(tmp_path / "dataset"))
+    monkeypatch.setattr(face_recog, "MODEL_WATCH_INTERVAL", 0)
+    monkeypatch.setattr(face_recog, "ATTENDANCE", False)
+    monkeypatch.setattr(face_recog, "started", False)
+    monkeypatch.setattr(face_recog, "model", None)
+    monkeypatch.setattr(face_recog.model_reloader, "last_error", None)
+    return face_recog
+
+
+def test_face_recog_reports_missing_model_instead_of_exiting(recognizer_service, tmp_path):
+    from train_faces import train
+
+    client = recognizer_service.app.test_client()
+    assert client.get("/health").status_code == 200
+    deadline = time.monotonic() + 10
+    while recognizer_service.model_reloader.last_error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert "trainer.yml" in response.get_json()["error"]
+
+    dataset = tmp_path / "dataset"
+    shutil.copytree(os.path.join(SERVER_DIR, "dataset"), dataset)
+    train(data_dir=str(dataset), trainer_path=str(tmp_path / "trainer.yml"), labels_path=str(tmp_path / "labels.json"))
+    recognizer_service.model_reloader.reload()
+    assert wait_for_ready(client).status_code == 200
@@ -1,55 +1,149 @@
+import argparse
 import cv2
+import json
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize LBPH face recognizer
-recognizer = cv2.face.LBPHFaceRecognizer_create()
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-# Dataset path
+# Dataset, model and label map paths
 data_dir = "streaming-server/dataset"
+trainer_path = "streaming-server/trainer.yml"
+labels_path = "streaming-server/labels.json"
+
+# Every face is resized to this before training and prediction
+FACE_SIZE = (200, 200)
+
+def preprocess_face(gray):
+    return cv2.resize(gray, FACE_SIZE, interpolation=cv2.INTER_AREA)
+
+def load_face(img_path):
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    return None if img is None else preprocess_face(img)
+
+def scan_dataset(data_dir):
+    """Returns {"<name>/<image>": (name, mtime_ns, size)} for every image in the dataset."""
+    images = {}
+    for name in sorted(os.listdir(data_dir)):
+        person_path = os.path.join(data_dir, name)
+        if not os.path.isdir(person_path):  # Skip non-folder files
+            continue
+        for img_name in sorted(os.listdir(person_path)):
+            stat = os.stat(os.path.join(person_path, img_name))
+            images[f"{name}/{img_name}"] = (name, stat.st_mtime_ns, stat.st_size)
+    return images
+
+def read_manifest(path=labels_path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_label_map(path=labels_path):
+    """Label ID -> name mapping saved with the model, or None for models trained before it existed."""
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+    return {label: name for name, label in manifest["labels"].items()}
 
-if not os.path.exists(data_dir):
-    print(f"❌ Dataset folder '{data_dir}' not found! Add images and try again.")
-    exit()
+def train(data_dir=data_dir, trainer_path=trainer_path, labels_path=labels_path, full=False, workers=None):
+    """
+    Trains the LBPH model on the dataset and saves it with its label map.
 
-labels = []
-faces = []
-label_dict = {}  # Mapping between labels and names
+    The label map also records every image the model was trained on and every
+    unreadable image that was skipped. Unless full is set, nothing is retrained
+    when the dataset matches that record, and new images that are all
+    unreadable are only recorded as skipped. Anything else is a full retrain:
+    LBPH's update() would need the saved model read back first, and reading
+    plus rewriting the YAML costs about as much as training from scratch
+    (benchmarks/bench_train.py).
+    Returns the number of images trained, 0 when nothing was retrained, or
+    None when no faces were found.
+    """
+    images = scan_dataset(data_dir)
+    current = {path: list(info[1:]) for path, info in images.items()}
+    manifest = None if full or not os.path.exists(trainer_path) else read_manifest(labels_path)
+    trained = manifest["images"] if manifest else {}
+    skipped = manifest.get("skipped", {}) if manifest else {}
 
-# Load images and prepare training data
-label_counter = 0
-for name in os.listdir(data_dir):
-    person_path = os.path.join(data_dir, name)
+    if manifest is not None and current == {**skipped, **trained}:
+        print("✅ Model is already up to date.")
+        return 0
 
-    if not os.path.isdir(person_path):  # Skip non-folder files
-        continue
+    # Image decoding and resizing release the GIL, so threads load in parallel
+    changed = [path for path in images if path not in trained or current[path] != trained[path]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        loaded = dict(zip(changed, pool.map(load_face, [os.path.join(data_dir, path) for path in changed])))
+        invalid = {path for path, img in loaded.items() if img is None}
+        for path in sorted(invalid):
+            print(f"⚠ Skipping invalid image: {os.path.join(data_dir, path)}")
 
-    label_dict[label_counter] = name  # Assign label (ID) to the person's name
+        model_unchanged = all(current.get(path) == info for path, info in trained.items())
+        if manifest is not None and model_unchanged and set(changed) == invalid:
+            # Only unreadable images were added; the model itself is unchanged
+            write_manifest(labels_path, manifest["labels"], trained, {path: current[path] for path in invalid})
+            return 0
 
-    for img_name in os.listdir(person_path):
-        img_path = os.path.join(person_path, img_name)
+        rest = [path for path in images if path not in loaded]
+        loaded.update(zip(rest, pool.map(load_face, [os.path.join(data_dir, path) for path in rest])))
 
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    label_ids = {}
+    faces = []
+    labels = []
+    for path, (name, *_) in images.items():
+        img = loaded[path]
         if img is None:
-            print(f"⚠ Skipping invalid image: {img_path}")
             continue
-
+        if name not in label_ids:
+            label_ids[name] = len(label_ids)  # Assign label (ID) to the person's name
         faces.append(img)
-        labels.append(label_counter)
+        labels.append(label_ids[name])
 
-    label_counter += 1
+    if not faces:
+        return None
 
-# Check if any data was collected
-if len(faces) == 0:
-    print("❌ No faces found in dataset! Add images to 'streaming-server/dataset/' and try again.")
-    exit()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, np.array(labels))
+    for name, label in label_ids.items():
+        recognizer.setLabelInfo(label, name)
 
-# Train the recognizer
-recognizer.train(faces, np.array(labels))
-trainer_path = "streaming-server/trainer.yml"
-recognizer.write(trainer_path)  # Save the trained model
+    # Write next to the live files and swap them in, so a reader never sees half a model
+    tmp_trainer = trainer_path + ".tmp.yml"
+    recognizer.write(tmp_trainer)
+    os.replace(tmp_trainer, trainer_path)
+    write_manifest(
+        labels_path, label_ids,
+        {path: info for path, info in current.items() if loaded[path] is not None},
+        {path: info for path, info in current.items() if loaded[path] is None},
+    )
+    return len(faces)
+
+def write_manifest(path, label_ids, trained, skipped):
+    with open(path + ".tmp", "w") as f:
+        json.dump({"labels": label_ids, "face_size": FACE_SIZE, "images": trained, "skipped": skipped}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the LBPH face recognizer on the dataset.")
+    parser.add_argument("--full", action="store_true", help="retrain even when the dataset is unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="image loading threads")
+    args = parser.parse_args()
+
+    if not os.path.exists(data_dir):
+        print(f"❌ Dataset folder '{data_dir}' not found! Add images and try again.")
+        exit()
+
+    count = train(full=args.full, workers=args.workers)
+
+    # Check if any data was collected
+    if count is None:
+        print("❌ No faces found in dataset! Add images to 'streaming-server/dataset/' and try again.")
+        exit()
+
+    if count:
+        print(f"✅ Training complete! Model saved as '{trainer_path}'")
+        print(f"📌 Total faces trained: {count}")
+        print(f"📌 Recognized labels: {load_label_map()}")
 
-print(f"✅ Training complete! Model saved as '{trainer_path}'")
-print(f"📌 Total faces trained: {len(faces)}")
-print(f"📌 Recognized labels: {label_dict}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from metrics import stage_timer, stream_label
+
+logger = logging.getLogger("video_pipeline")
+
+OutputProfile = namedtuple("OutputProfile", "name width quality fps")
+
+# Quality tiers a viewer moves through as its connection falls behind or recovers;
+# width None keeps the camera's resolution. Detection always sees native frames.
+OUTPUT_PROFILES = (
+    OutputProfile("high", None, 80, 30.0),
+    OutputProfile("medium", 960, 70, 15.0),
+    OutputProfile("low", 640, 55, 10.0),
+    OutputProfile("minimal", 320, 40, 5.0),
+)
+
+
+def profile_index(profiles, quality=None, width=None):
+    """Index of the named profile, or of the best one no wider than width; 0 when neither is given."""
+    if quality is not None:
+        for i, profile in enumerate(profiles):
+            if profile.name == quality:
+                return i
+        raise ValueError(f"Unknown quality {quality!r}, expected one of {[p.name for p in profiles]}")
+    if width:
+        for i, profile in enumerate(profiles):
+            if profile.width is not None and profile.width <= width:
+                return i
+        return len(profiles) - 1
+    return 0
+
+
+def scale_to_width(frame, width):
+    """Downscales frame to at most width pixels wide, keeping the aspect ratio; never upscales."""
+    height, native = frame.shape[:2]
+    if not width or native <= width:
+        return frame
+    return cv2.resize(frame, (width, max(1, round(height * width / native))), interpolation=cv2.INTER_AREA)
+
+
+class QualityController:
+    """
+    Picks a viewer's output profile from how long it takes to deliver each frame.
+
+    record() is given the time a frame spent being sent and the frame interval
+    the viewer is meant to keep up with. slow_frames consecutive frames over
+    budget step the viewer down one profile; fast_frames consecutive frames
+    under half the budget step it back up, never above the profile it started
+    at. With adaptive off the starting profile is kept.
+    """
+
+    def __init__(self, profiles=OUTPUT_PROFILES, start=0, adaptive=True, slow_frames=3, fast_frames=60):
+        self.profiles = profiles
+        self.start = start
+        self.index = start
+        self.adaptive = adaptive
+        self.slow_frames = slow_frames
+        self.fast_frames = fast_frames
+        self.changes = 0
+        self._slow = 0
+        self._fast = 0
+
+    @property
+    def profile(self):
+        return self.profiles[self.index]
+
+    def interval(self, fps=None):
+        """Seconds between frames for this profile, further capped by the viewer's own fps."""
+        rates = [rate for rate in (self.profile.fps, fps) if rate]
+        return 1.0 / min(rates) if rates else 0.0
+
+    def record(self, seconds, interval):
+        if not self.adaptive or not interval:
+            return self.index
+        if seconds > interval:
+            self._slow, self._fast = self._slow + 1, 0
+        elif seconds < interval / 2:
+            self._slow, self._fast = 0, self._fast + 1
+        else:
+            self._slow = self._fast = 0
+
+        if self._slow >= self.slow_frames and self.index < len(self.profiles) - 1:
+            self._step(1)
+        elif self._fast >= self.fast_frames and self.index > self.start:
+            self._step(-1)
+        return self.index
+
+    def _step(self, direction):
+        self.index += direction
+        self.changes += 1
+        self._slow = self._fast = 0
+        logger.info(f"Viewer switched to {self.profile.name} output")
+
+
+class LatestFrame:
+    """
+    Single-slot buffer that only ever holds the newest value.
+
+    Writers never block; readers wait for a sequence number newer than the last
+    one they saw, so a slow reader skips straight to the latest value instead
+    of working through a backlog.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self.seq = 0
+        self.closed = False
+
+    def put(self, value):
+        with self._cond:
+            self._value = value
+            self.seq += 1
+            self._cond.notify_all()
+
+    def get(self, after=0, timeout=None):
+        """Returns (seq, value) once seq > after, or (after, None) on timeout/close."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after or self.closed, timeout) or self.seq <= after:
+                return after, None
+            return self.seq, self._value
+
+    def peek(self):
+        with self._cond:
+            return self.seq, self._value
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads a cv2.VideoCapture source as fast as it produces and keeps only the latest frame.
+
+    All blocking calls (open, read, decode) happen on this thread. When the source
+    fails it is reopened with exponential backoff, from reconnect_delay up to
+    max_reconnect_delay, resetting once frames flow again.
+    """
+
+    def __init__(self, source, output, reconnect_delay=0.5, max_reconnect_delay=30.0, open_capture=cv2.VideoCapture,
+                 name=None):
+        self.stream = name or stream_label(source)
+        super().__init__(daemon=True, name=f"capture-{self.stream}")
+        self.source = source
+        self.output = output
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.open_capture = open_capture
+        self._stop_event = threading.Event()
+
+        self.frames = 0
+        self.reconnects = 0
+        self.read_failures = 0
+        self.read_seconds = 0.0
+        self._read_timer = stage_timer("read", self.stream)
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "reconnects": self.reconnects,
+            "read_failures": self.read_failures,
+            "avg_read_ms": self.read_seconds / self.frames * 1000 if self.frames else 0.0,
+        }
+
+    def run(self):
+        cap = None
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            if cap is None:
+                cap = self.open_capture(self.source)
+                if not cap.isOpened():
+                    logger.error(f"Failed to open video source: {self.stream}, retrying in {delay:.1f}s")
+                    cap.release()
+                    cap = None
+                    self._stop_event.wait(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    self.reconnects += 1
+                    continue
+                # Keep the driver from queueing stale frames behind our back
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            # One stage: with FFmpeg, grab() both waits on the network and decodes,
+            # and retrieve() only converts the color format, so the two can't be told apart
+            started = time.perf_counter()
+            success, frame = cap.read()
+            elapsed = time.perf_counter() - started
+            self.read_seconds += elapsed
+            self._read_timer.observe(elapsed)
+            if not success:
+                self.read_failures += 1
+                logger.warning(f"Failed to read frame from {self.stream}, reopening in {delay:.1f}s...")
+                cap.release()
+                cap = None
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                self.reconnects += 1
+                continue
+
+            delay = self.reconnect_delay
+            self.frames += 1
+            self.output.put(frame)
+
+        if cap is not None:
+            cap.release()
+
+
+class FramePipeline:
+    """
+    Capture -> analyze -> annotate/encode pipeline shared by every viewer of a source.
+
+    One thread captures into a latest-frame buffer, one runs analyze(frame) on the
+    newest native-resolution frame at most detect_fps times a second, and one
+    draws the most recent results onto each new frame and JPEG-encodes it once
+    per output profile that has viewers, at that profile's size, quality and
+    frame rate. Viewers on the same profile share the encoded bytes, so the
+    cost does not grow with the number of viewers. The first viewer starts the
+    threads and the last one to leave stops them, unless keep_running is set
+    (attendance analyzes rooms nobody is watching).
+    """
+
+    def __init__(self, source, analyze, annotate, detect_fps=5.0, open_capture=cv2.VideoCapture, name=None,
+                 profiles=OUTPUT_PROFILES):
+        self.source = source
+        self.name = name or stream_label(source)
+        self.open_capture = open_capture
+        self.analyze = analyze
+        self.annotate = annotate
+        self.detect_interval = 1.0 / detect_fps if detect_fps else 0.0
+        self.profiles = profiles
+
+        self.raw = LatestFrame()
+        self.outputs = [LatestFrame() for _ in profiles]  # JPEG bytes per profile
+        self.profile_viewers = [0] * len(profiles)
+        self.detections = []
+        self.viewers = 0
+        self.keep_running = False
+        self.encoded = 0
+        self.dropped = 0  # captured frames replaced by a newer one before being encoded
+        self.capture = None
+        self._analyze_timer = stage_timer("analyze", self.name)
+        self._annotate_timer = stage_timer("annotate", self.name)
+        self._imencode_timer = stage_timer("imencode", self.name)
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def _start(self):
+        if self._threads:
+            return
+        # Fresh buffers and stop event per run, so threads of a previous run that are slow to exit can't touch them
+        self.raw = LatestFrame()
+        self.outputs = [LatestFrame() for _ in self.profiles]
+        self._stop_event = stop_event = threading.Event()
+        self.capture = CaptureThread(self.source, self.raw, open_capture=self.open_capture, name=self.name)
+        self._threads = [
+            self.capture,
+            threading.Thread(target=self._detect_loop, args=(self.raw, stop_event), daemon=True,
+                             name=f"detect-{self.name}"),
+            threading.Thread(target=self._encode_loop, args=(self.raw, self.outputs, stop_event), daemon=True,
+                             name=f"encode-{self.name}"),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _stop(self):
+        if not self._threads:
+            return
+        self._stop_event.set()
+        self.capture.stop()
+        self.raw.close()
+        for output in self.outputs:
+            output.close()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
+
+    def _detect_loop(self, raw, stop_event):
+        seq = 0
+        while not stop_event.is_set():
+            seq, frame = raw.get(seq, timeout=1.0)
+            if frame is None:
+                continue
+            started = time.monotonic()
+            try:
+                self.detections = self.analyze(frame)
+            except Exception:
+                logger.exception(f"Analysis failed for {self.name}")
+            elapsed = time.monotonic() - started
+            self._analyze_timer.observe(elapsed)
+            stop_event.wait(max(0.0, self.detect_interval - elapsed))
+
+    def _encode_loop(self, raw, outputs, stop_event):
+        seq = 0
+        last_encoded = [0.0] * len(self.profiles)
+        while not stop_event.is_set():
+            previous = seq
+            seq, frame = raw.get(seq, timeout=1.0)
+            if frame is None:
+                continue
+            if previous:
+                self.dropped += seq - previous - 1
+
+            now = time.monotonic()
+            # A little slack so a 30 fps camera feeding a 30 fps profile doesn't alias down to 15
+            due = [
+                i for i, profile in enumerate(self.profiles)
+                if self.profile_viewers[i] and now - last_encoded[i] >= 0.9 / profile.fps
+            ]
+            if not due:
+                continue
+
+            # The detect thread may still be reading this frame, so draw on a copy
+            with self._annotate_timer.time():
+                frame = frame.copy()
+                self.annotate(frame, self.detections)
+            self.encoded += 1
+            for i in due:
+                profile = self.profiles[i]
+                with self._imencode_timer.time():
+                    scaled = scale_to_width(frame, profile.width)
+                    success, buffer = cv2.imencode(".jpg", scaled, [cv2.IMWRITE_JPEG_QUALITY, profile.quality])
+                last_encoded[i] = now
+                if success:
+                    outputs[i].put(buffer.tobytes())
+
+    def _join(self, index):
+        """Adds a viewer to a profile; returns the sequence number it should read after."""
+        with self._lock:
+            self.profile_viewers[index] += 1
+            # A profile nobody was watching still holds its last frame from back then
+            return self.outputs[index].seq if self.profile_viewers[index] == 1 else 0
+
+    def _leave(self, index):
+        with self._lock:
+            self.profile_viewers[index] -= 1
+
+    def frames(self, quality=None, fps=None, width=None, adaptive=True):
+        """
+        Yields the latest encoded JPEG each time a new one is produced.
+
+        quality names the starting profile (or width picks the best one no wider
+        than it) and fps caps the rate below the profile's own. Unless adaptive
+        is off, the viewer moves to a lower profile while sending frames takes
+        longer than the frame interval and back up once it keeps up. Frames that
+        go stale while a viewer is busy are skipped, never queued.
+        """
+        controller = QualityController(self.profiles, profile_index(self.profiles, quality, width), adaptive)
+        with self._lock:
+            self._start()
+            self.viewers += 1
+            raw, outputs, stop_event = self.raw, self.outputs, self._stop_event
+        index = controller.index
+        seq = self._join(index)
+        try:
+            while not raw.closed:
+                seq, data = outputs[index].get(seq, timeout=5.0)
+                if data is None:
+                    continue
+                interval = controller.interval(fps)
+                started = time.monotonic()
+                yield data
+                # The WSGI server writes each chunk before resuming us, so this is the send time
+                sent = time.monotonic() - started
+                if controller.record(sent, interval) != index:
+                    self._leave(index)
+                    index = controller.index
+                    seq = self._join(index)
+                # The encoder already paces each profile; only a lower cap needs waiting, then the newest frame
+                if fps and fps < controller.profile.fps:
+                    stop_event.wait(max(0.0, 0.9 / fps - sent))
+        finally:
+            self._leave(index)
+            with self._lock:
+                self.viewers -= 1
+                # Like RTSPRelay.unsubscribe: no viewers, no capture, decode or recognition
+                if not self.viewers and not self.keep_running:
+                    logger.info(f"Last viewer of {self.name} left, stopping the pipeline")
+                    self._stop()